@@ -14,7 +14,21 @@ Examples:
         ["text", {"id": "custom", "data": "text2"}] → [{"id": 0, "data": "text"}, {"id": "custom", "data": "text2"}]
 """
 
-from typing import List, Dict, Any, Union
+import re
+import sys
+import unicodedata
+from typing import List, Dict, Any, Tuple, Union
+
+# Keys of every normalized item, interned once so dict lookups compare by pointer
+_ID = sys.intern("id")
+_DATA = sys.intern("data")
+
+# Types that can never be dicts, so the isinstance() fallback can be skipped
+_SCALAR_TYPES = frozenset({str, int, float, bool, type(None)})
+
+# Whitespace around a line break, and runs of whitespace within a line, compiled once
+_LINE_BREAK = re.compile(r"[^\S\n]*\n[^\S\n]*")
+_HORIZONTAL_SPACE = re.compile(r"[^\S\n]+")
 
 
 class InputNormalizer:
@@ -26,13 +40,15 @@ class InputNormalizer:
         Convert various input formats to standard {id, data} format.
 
         Args:
-            input_list: List of items (strings, numbers, dicts, etc.)
+            input_list: List of items (strings, numbers, dicts, etc.).
+                        Array-likes exposing ``tolist()`` (NumPy arrays,
+                        ``array.array``) are converted to a list in one call.
 
         Returns:
             List of dicts with {id, data} format
 
         Raises:
-            TypeError: If input is not a list
+            TypeError: If input is not a list or array-like
 
         Examples:
             >>> InputNormalizer.normalize(["text1", "text2"])
@@ -44,35 +60,121 @@ class InputNormalizer:
             >>> InputNormalizer.normalize(["text", {"id": 99, "data": "text2"}])
             [{"id": 0, "data": "text"}, {"id": 99, "data": "text2"}]
         """
+        # Array-likes: convert once in C instead of boxing each element on access
+        if not isinstance(input_list, list) and hasattr(input_list, "tolist"):
+            input_list = input_list.tolist()
+
         if not isinstance(input_list, list):
             raise TypeError(f"Input must be a list, got {type(input_list).__name__}")
 
         normalized = []
         auto_id_counter = 0
 
-        for item in input_list:
-            # Case 1: Already in {id, data} format - preserve as-is
-            if isinstance(item, dict) and "id" in item and "data" in item:
-                normalized.append(item)
+        append = normalized.append
 
-            # Case 2: Dict with id but no data field
-            elif isinstance(item, dict) and "id" in item:
-                # Treat the whole dict as data
-                normalized.append({"id": item["id"], "data": item})
+        for item in input_list:
+            # Exact type check is a pointer compare; dict subclasses and
+            # other unusual types fall back to isinstance()
+            item_type = type(item)
+
+            # Case 1: Simple value (string, number, bool, None, etc.)
+            # Checked first since plain values are the common input
+            if item_type is not dict and (
+                item_type in _SCALAR_TYPES or not isinstance(item, dict)
+            ):
+                append({_ID: auto_id_counter, _DATA: item})
+                auto_id_counter += 1
 
-            # Case 3: Dict without id field
-            elif isinstance(item, dict):
+            # Case 2: Dict without id field
+            elif _ID not in item:
                 # Assign auto id
-                normalized.append({"id": auto_id_counter, "data": item})
+                append({_ID: auto_id_counter, _DATA: item})
                 auto_id_counter += 1
 
-            # Case 4: Simple value (string, number, bool, None, etc.)
+            # Case 3: Already in {id, data} format - preserve as-is
+            elif _DATA in item:
+                append(item)
+
+            # Case 4: Dict with id but no data field
             else:
-                normalized.append({"id": auto_id_counter, "data": item})
-                auto_id_counter += 1
+                # Treat the whole dict as data
+                append({_ID: item[_ID], _DATA: item})
 
         return normalized
 
+    @staticmethod
+    def normalize_columns(input_list: List[Any]) -> Tuple[List[Any], List[Any]]:
+        """
+        Normalize input into two parallel columns instead of a list of dicts.
+
+        Applies the same id/data rules as normalize(), but returns
+        (ids, data) lists so batch consumers can scan one column without
+        building a dict per item. Extra keys on {id, data} dicts are dropped.
+
+        Args:
+            input_list: List of items (strings, numbers, dicts, etc.)
+
+        Returns:
+            Tuple of (ids, data), where ids[i] and data[i] describe item i
+
+        Raises:
+            TypeError: If input is not a list or array-like
+
+        Examples:
+            >>> InputNormalizer.normalize_columns(["text", {"id": 99, "data": "text2"}])
+            ([0, 99], ["text", "text2"])
+        """
+        if not isinstance(input_list, list) and hasattr(input_list, "tolist"):
+            input_list = input_list.tolist()
+
+        if not isinstance(input_list, list):
+            raise TypeError(f"Input must be a list, got {type(input_list).__name__}")
+
+        ids = []
+        data = []
+        auto_id_counter = 0
+
+        for item in input_list:
+            item_type = type(item)
+            is_dict = item_type is dict or (
+                item_type not in _SCALAR_TYPES and isinstance(item, dict)
+            )
+
+            if is_dict and _ID in item:
+                ids.append(item[_ID])
+                data.append(item[_DATA] if _DATA in item else item)
+            else:
+                ids.append(auto_id_counter)
+                data.append(item)
+                auto_id_counter += 1
+
+        return ids, data
+
+    @staticmethod
+    def clean_text(text: str) -> str:
+        """
+        Prepare text for an LLM prompt.
+
+        Applies Unicode NFC normalization (composed characters tokenize more
+        compactly), collapses runs of spaces and tabs within a line to a single
+        space and trims them around line breaks. Line breaks are kept, so
+        paragraphs, lists and tables keep their structure.
+
+        Args:
+            text: Raw input text
+
+        Returns:
+            Cleaned text
+
+        Examples:
+            >>> InputNormalizer.clean_text("  Cafe\u0301  au\t lait \r\n\n  Menu ")
+            "Café au lait\n\nMenu"
+        """
+        if not text.isascii():
+            text = unicodedata.normalize("NFC", text)
+        text = _LINE_BREAK.sub("\n", text)
+        return _HORIZONTAL_SPACE.sub(" ", text).strip()
+
     @staticmethod
     def denormalize(normalized_list: List[Dict[str, Any]]) -> List[Any]:
         """
@@ -88,4 +190,4 @@ class InputNormalizer:
             >>> InputNormalizer.denormalize([{"id": 0, "data": "text1"}, {"id": 1, "data": "text2"}])
             ["text1", "text2"]
         """
-        return [item["data"] for item in normalized_list]
+        return [item[_DATA] for item in normalized_list]
@@ -6,14 +6,70 @@ Supports OpenAI and OpenAI-compatible APIs.
 
 import os
 import json
+import random
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
-
-from openai import AsyncOpenAI
+import importlib.util
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from openai import (
+    APIConnectionError,
+    AsyncOpenAI,
+    DefaultAsyncHttpxClient,
+    InternalServerError,
+    RateLimitError,
+)
+
+from .rate_limiter import AdaptiveLimiter
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Connection pool shared by all requests; HTTP/2 multiplexes them when h2 is installed
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+HTTP2_ENABLED = importlib.util.find_spec("h2") is not None
+
+# Starting and maximum number of concurrent requests per model (adapted with AIMD)
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+
+# Retries for transient failures, with full-jitter exponential backoff (seconds)
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 30.0
+
+# Failures worth retrying: rate limits, timeouts, dropped connections and 5xx
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+
+# Longest Retry-After wait honored (seconds); longer requests fall back to backoff, as in the SDK
+RETRY_AFTER_MAX = 60.0
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds the provider asked us to wait (retry-after-ms / Retry-After), or None."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            delay = float(headers["retry-after-ms"]) / 1000
+        elif "retry-after" in headers:
+            value = headers["retry-after"]
+            try:
+                delay = float(value)
+            except ValueError:
+                # HTTP-date form
+                delay = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        else:
+            return None
+    except (TypeError, ValueError):
+        return None
+    return delay if 0 <= delay <= RETRY_AFTER_MAX else None
+
 
 class LLMClient:
     """OpenAI-based LLM client with OpenRouter support."""
@@ -40,16 +96,28 @@ class LLMClient:
         # Initialize client (will be set per-request based on model)
         self.openai_client = None
         self.openrouter_client = None
+
+        # One keep-alive pool for both providers, reused across requests
+        self.http_client = DefaultAsyncHttpxClient(limits=HTTP_LIMITS, http2=HTTP2_ENABLED)
         
         if openai_key:
-            self.openai_client = AsyncOpenAI(api_key=openai_key)
+            self.openai_client = AsyncOpenAI(
+                api_key=openai_key,
+                http_client=self.http_client,
+                max_retries=0  # Retried in _create, outside the concurrency cap
+            )
 
         if openrouter_key:
             self.openrouter_client = AsyncOpenAI(
                 api_key=openrouter_key,
-                base_url="https://openrouter.ai/api/v1"
+                base_url="https://openrouter.ai/api/v1",
+                http_client=self.http_client,
+                max_retries=0
             )
 
+        # Per-model caps on in-flight requests
+        self.limiters: Dict[str, AdaptiveLimiter] = {}
+
     def _get_client(self, model: str) -> AsyncOpenAI:
         """
         Get appropriate client based on model name.
@@ -73,12 +141,103 @@ class LLMClient:
                 raise ValueError("OPENAI_API_KEY not set but model requires OpenAI")
             return self.openai_client
 
+    async def _create(
+        self,
+        client: AsyncOpenAI,
+        model: str,
+        consume: Optional[Callable[[Any], Awaitable[Any]]] = None,
+        **kwargs
+    ) -> Any:
+        """
+        Create a chat completion under the model's adaptive concurrency cap.
+
+        The cap is halved when the provider rate-limits us (or reports no
+        requests remaining) and grows back while requests succeed. Transient
+        failures are retried up to MAX_RETRIES times with full-jitter
+        exponential backoff, waiting without holding a slot.
+
+        Args:
+            client: Client to send the request with
+            model: Model name
+            consume: Optional async function reading the parsed response (e.g. a
+                     stream) while the slot is still held; a failure inside it is
+                     retried like a failed request
+            **kwargs: Arguments for chat.completions.create
+
+        Returns:
+            Parsed ChatCompletion, or what consume returned for it
+        """
+        limiter = self.limiters.get(model)
+        if limiter is None:
+            limiter = self.limiters[model] = AdaptiveLimiter(MAX_CONCURRENCY, max_limit=MAX_CONCURRENCY)
+
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                async with limiter.slot() as started:
+                    try:
+                        raw = await client.chat.completions.with_raw_response.create(model=model, **kwargs)
+                        response = raw.parse()
+                        if consume is not None:
+                            # Streams are read inside the slot, so they count against the cap
+                            response = await consume(response)
+                    except RateLimitError:
+                        limiter.on_rate_limited(started)
+                        raise
+            except RETRYABLE_ERRORS as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+                # Wait at least as long as the provider asked
+                delay = max(delay, _retry_after(e) or 0.0)
+                logger.warning(f"⚠️ LLM request failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            limiter.on_success(raw.headers, started)
+            return response
+
+    @staticmethod
+    async def _read_stream(stream: Any, stop_when: Callable[[str], bool]) -> str:
+        """Collect streamed text, closing the stream early once stop_when is satisfied."""
+        parts: List[str] = []
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    if stop_when("".join(parts)):
+                        break
+        finally:
+            # Closing the connection stops the provider from generating the rest
+            await stream.close()
+        return "".join(parts)
+
+    def _cache_options(self, client: AsyncOpenAI, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """
+        Build prompt-cache routing options for a request.
+
+        Requests that share a system prompt share a prompt_cache_key, so OpenAI
+        routes them to the same cache and can reuse the prefill of that prefix.
+        OpenRouter requests are left unchanged.
+
+        Args:
+            client: Client the request will be sent with
+            messages: Messages of the request
+
+        Returns:
+            Extra keyword arguments for chat.completions.create
+        """
+        if client is not self.openai_client or not messages or messages[0]["role"] != "system":
+            return {}
+        prefix = messages[0]["content"].encode("utf-8")
+        return {"prompt_cache_key": hashlib.sha256(prefix).hexdigest()[:32]}
+
     async def chat(
         self,
         messages: List[Dict[str, str]],
         model: Optional[str] = None,
         temperature: float = 0.0,
-        max_tokens: int = 1000
+        max_tokens: int = 1000,
+        response_format: Optional[Dict[str, Any]] = None,
+        stop_when: Optional[Callable[[str], bool]] = None
     ) -> str:
         """
         Send chat request to LLM and return text response.
@@ -90,6 +249,11 @@ class LLMClient:
                    For OpenRouter: "openai/gpt-4o-mini", "anthropic/claude-3-5-sonnet", etc.
             temperature: Sampling temperature (0.0 to 1.0)
             max_tokens: Maximum tokens to generate
+            response_format: Optional OpenAI response_format (e.g. a json_schema
+                             that constrains the output)
+            stop_when: Optional check on the text received so far; if given, the
+                       response is streamed and generation is cancelled as
+                       soon as the check returns True
 
         Returns:
             Generated text response
@@ -116,15 +280,24 @@ class LLMClient:
             logger.info(msg['content'])
             logger.info("-" * 80)
 
-        # Call OpenAI API
-        response = await client.chat.completions.create(
-            model=model,
+        # Call OpenAI API (a stop_when response is streamed and read up to the stop)
+        consume = (lambda stream: self._read_stream(stream, stop_when)) if stop_when else None
+        response = await self._create(
+            client,
+            model,
+            consume,
             messages=messages,
             temperature=temperature,
-            max_tokens=max_tokens
+            max_tokens=max_tokens,
+            **({"response_format": response_format} if response_format else {}),
+            **({"stream": True} if stop_when else {}),
+            **self._cache_options(client, messages)
         )
         
-        response_content = response.choices[0].message.content
+        if stop_when:
+            response_content = response
+        else:
+            response_content = response.choices[0].message.content
         
         # Log the response
         logger.info(f"📥 LLM RESPONSE:")
@@ -202,11 +375,13 @@ class LLMClient:
             logger.info(msg['content'])
             logger.info("-" * 80)
 
-        response = await client.chat.completions.create(
-            model=model,
+        response = await self._create(
+            client,
+            model,
             messages=modified_messages,
             temperature=temperature,
-            response_format={"type": "json_object"}
+            response_format={"type": "json_object"},
+            **self._cache_options(client, modified_messages)
         )
 
         response_content = response.choices[0].message.content
@@ -219,6 +394,10 @@ class LLMClient:
         # Parse JSON response
         return json.loads(response_content)
 
+    async def aclose(self) -> None:
+        """Close the shared HTTP connection pool."""
+        await self.http_client.aclose()
+
     def get_default_model(self) -> str:
         """Get default model for current provider."""
         return os.getenv("LLM_MODEL", "openai/gpt-4o-mini")
@@ -0,0 +1,95 @@
+"""
+Adaptive rate limiting for LLM requests.
+
+Caps the number of in-flight requests per model and adjusts the cap with
+AIMD (additive increase, multiplicative decrease): it shrinks by half when
+the provider signals a rate limit and grows back slowly while requests
+succeed. A burst of rejections for requests that were all in flight at the
+same time counts as one signal, so it halves the cap once, not once per
+rejection.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Mapping, Optional
+
+
+def _remaining(headers: Mapping[str, str], name: str) -> Optional[int]:
+    """Read an integer rate-limit header, or None if missing or malformed."""
+    value = headers.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class AdaptiveLimiter:
+    """AIMD-controlled cap on concurrent requests."""
+
+    def __init__(self, limit: int = 16, min_limit: int = 1, max_limit: int = 64):
+        """
+        Initialize limiter.
+
+        Args:
+            limit: Starting number of requests allowed in flight
+            min_limit: Lowest the cap can shrink to
+            max_limit: Highest the cap can grow to
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(limit, self.min_limit), self.max_limit))
+        self.in_flight = 0
+        # Number of decreases so far; a request remembers the count it started under
+        self.decreases = 0
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[int]:
+        """
+        Wait until a request may start, and hold its slot until it ends.
+
+        Yields:
+            The decrease count when the request started, to pass back to
+            on_success/on_rate_limited as `started`
+        """
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+            started = self.decreases
+        try:
+            yield started
+        finally:
+            async with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def on_success(self, headers: Optional[Mapping[str, str]] = None, started: Optional[int] = None) -> None:
+        """
+        Record a successful request.
+
+        The cap grows by about one per full window of successes. If the
+        response headers report the request quota as used up, the cap is
+        halved instead, before the provider starts rejecting requests.
+
+        Args:
+            headers: Response headers (x-ratelimit-remaining-requests is read if present)
+            started: Value yielded by slot() for this request, if any
+        """
+        if headers is not None and _remaining(headers, "x-ratelimit-remaining-requests") == 0:
+            self.on_rate_limited(started)
+            return
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def on_rate_limited(self, started: Optional[int] = None) -> None:
+        """
+        Record a rate-limit rejection by halving the cap.
+
+        Args:
+            started: Value yielded by slot() for this request, if any. A request
+                     that started before the last decrease was already part of
+                     the burst that caused it, so its signal is ignored.
+        """
+        if started is not None and started != self.decreases:
+            return
+        self.limit = max(self.min_limit, self.limit / 2)
+        self.decreases += 1
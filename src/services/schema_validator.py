@@ -5,21 +5,256 @@ Validates LLM outputs against JSON Schema Draft 7 specifications.
 Supports nested objects, type constraints, and advanced validation rules.
 """
 
+import functools
+import json
+import sys
+from operator import attrgetter
+
 import jsonschema
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+# Schema keywords read on every cached lookup, interned once at import
+_TYPE = sys.intern("type")
+_PROPERTIES = sys.intern("properties")
+_REQUIRED = sys.intern("required")
+
+# Per-schema cache of derived lookups, keyed by (id(schema), kind).
+# Each entry keeps a reference to its schema so the id cannot be reused
+# while the entry is alive. Schemas are treated as immutable once used;
+# call SchemaValidator.clear_cache() after mutating one in place.
+_CACHE_MAXSIZE = 256
+_schema_cache: Dict[Tuple[int, str], Tuple[Dict[str, Any], Any]] = {}
+
+
+def _cached(schema: Dict[str, Any], kind: str, build: Callable[[Dict[str, Any]], Any]) -> Any:
+    """Return build(schema), computing it at most once per live schema object."""
+    key = (id(schema), kind)
+    entry = _schema_cache.get(key)
+    if entry is not None and entry[0] is schema:
+        return entry[1]
+
+    value = build(schema)
+    if len(_schema_cache) >= _CACHE_MAXSIZE:
+        # Evict the oldest entry (dicts preserve insertion order)
+        _schema_cache.pop(next(iter(_schema_cache)))
+    _schema_cache[key] = (schema, value)
+    return value
+
+
+def _build_validator(schema: Dict[str, Any]) -> Any:
+    """Return the validator for schema, shared by every schema with the same content."""
+    # Tool calls bring a fresh response_format dict each time, so the id-keyed
+    # cache alone would recompile the same schema on every call
+    try:
+        schema_json = json.dumps(schema, sort_keys=True)
+    except (TypeError, ValueError):
+        # Not plain JSON (e.g. mixed-type keys): compile this object without sharing
+        return _compile(schema)
+    return _compile_validator(schema_json)
+
+
+@functools.lru_cache(maxsize=_CACHE_MAXSIZE)
+def _compile_validator(schema_json: str) -> Any:
+    """Compile a schema given as canonical JSON, once per distinct schema."""
+    return _compile(json.loads(schema_json))
+
+
+def _compile(schema: Dict[str, Any]) -> Any:
+    """Check the schema and return a reusable validator instance."""
+    cls = jsonschema.validators.validator_for(schema, default=jsonschema.Draft7Validator)
+    cls.check_schema(schema)
+    return cls(schema)
+
+
+_error_fields = attrgetter("path", "message", "validator", "instance")
+
+
+def _format_error(error: jsonschema.exceptions.ValidationError) -> str:
+    error_path = " -> ".join(map(str, error.path)) if error.path else "root"
+    return f"Validation error at '{error_path}': {error.message}"
+
+
+# Exact-type checks for the fast path, as templates over the checked
+# expression. They are stricter than JSON Schema (e.g. 1.0 is not accepted
+# as "integer"), which is safe: a False result only means the full
+# validator runs.
+_FAST_TYPE_CHECKS = {
+    "string": "type({v}) is str",
+    "number": "type({v}) is int or type({v}) is float",
+    "integer": "type({v}) is int",
+    "boolean": "type({v}) is bool",
+    "null": "{v} is None",
+}
+_FAST_SCHEMA_KEYS = frozenset({"$schema", "type", "properties", "required", "title", "description"})
+_FAST_OBJECT_KEYS = frozenset({"type", "properties", "required", "title", "description"})
+_FAST_ARRAY_KEYS = frozenset({"type", "items", "title", "description"})
+_FAST_PROPERTY_KEYS = frozenset({"type", "title", "description"})
+_FAST_MAX_DEPTH = 8
+_MISSING = object()
+
+
+def _emit_fast_check(node: Any, expr: str, lines: List[str], indent: str, depth: int) -> bool:
+    """
+    Append checks that `expr` matches the schema node to lines.
+
+    Returns False if the node uses anything the fast path doesn't handle.
+    """
+    if not isinstance(node, dict) or depth > _FAST_MAX_DEPTH:
+        return False
+    node_type = node.get(_TYPE)
+
+    if node_type == "object":
+        if not _FAST_OBJECT_KEYS.issuperset(node):
+            return False
+        properties = node.get(_PROPERTIES, {})
+        required = node.get(_REQUIRED, [])
+        if not isinstance(properties, dict) or not isinstance(required, list):
+            return False
+        if not all(isinstance(name, str) for name in required) or len(set(required)) != len(required):
+            return False
+
+        lines.append(f"{indent}if type({expr}) is not dict:")
+        lines.append(f"{indent}    return False")
+        for name in required:
+            lines.append(f"{indent}if {name!r} not in {expr}:")
+            lines.append(f"{indent}    return False")
+        value = f"v{depth}"
+        for name, field_schema in properties.items():
+            lines.append(f"{indent}{value} = {expr}.get({name!r}, _MISSING)")
+            lines.append(f"{indent}if {value} is not _MISSING:")
+            if not _emit_fast_check(field_schema, value, lines, indent + "    ", depth + 1):
+                return False
+        return True
+
+    if node_type == "array":
+        if not _FAST_ARRAY_KEYS.issuperset(node):
+            return False
+        lines.append(f"{indent}if type({expr}) is not list:")
+        lines.append(f"{indent}    return False")
+        if "items" in node:
+            element = f"e{depth}"
+            lines.append(f"{indent}for {element} in {expr}:")
+            if not _emit_fast_check(node["items"], element, lines, indent + "    ", depth + 1):
+                return False
+        return True
+
+    # Primitive types, alone or as a list such as ["string", "null"]
+    if not _FAST_PROPERTY_KEYS.issuperset(node):
+        return False
+    types = node_type if isinstance(node_type, list) else [node_type]
+    if not types or any(t not in _FAST_TYPE_CHECKS for t in types):
+        return False
+    condition = " or ".join(f"({_FAST_TYPE_CHECKS[t].format(v=expr)})" for t in types)
+    lines.append(f"{indent}if not ({condition}):")
+    lines.append(f"{indent}    return False")
+    return True
+
+
+def _build_fast_check(schema: Dict[str, Any]) -> Optional[Callable[[Any], bool]]:
+    """
+    Generate a specialized checker for plain object schemas.
+
+    Handles {"type": "object", "properties": {...}} schemas whose properties
+    are primitive types, nested objects of the same kind, or arrays of
+    either. Returns None for any other shape, and for schemas (or nested
+    schemas) that fail check_schema. The generated function returns True
+    only when the data is certainly valid.
+    """
+    if schema.get(_TYPE) != "object" or not _FAST_SCHEMA_KEYS.issuperset(schema):
+        return None
+
+    # The generated check reads only a few keywords, so it must never stand
+    # in for a schema that hasn't passed the full check
+    try:
+        _cached(schema, "validator", _build_validator)
+    except jsonschema.exceptions.SchemaError:
+        return None
+
+    root = {key: value for key, value in schema.items() if key != "$schema"}
+    lines = ["def _check(d):"]
+    if not _emit_fast_check(root, "d", lines, "    ", 0):
+        return None
+    lines.append("    return True")
+
+    namespace = {"_MISSING": _MISSING}
+    exec("\n".join(lines), namespace)
+    return namespace["_check"]
+
+
+def _build_required(schema: Dict[str, Any]) -> frozenset:
+    if schema.get(_TYPE) == "object":
+        return frozenset(schema.get(_REQUIRED, ()))
+    return frozenset()
+
+
+def _build_nullable(schema: Dict[str, Any]) -> frozenset:
+    if schema.get(_TYPE) != "object":
+        return frozenset()
+
+    nullable = set()
+    for name, field_schema in schema.get(_PROPERTIES, {}).items():
+        field_type = field_schema.get(_TYPE)
+        # Check if type is an array containing "null"
+        if isinstance(field_type, list) and "null" in field_type:
+            nullable.add(name)
+    return frozenset(nullable)
+
+
+# Static parts of the retry feedback message, built once
+_FEEDBACK_PREAMBLE = "The previous response had validation errors:\n"
+_FEEDBACK_EPILOGUE = (
+    "\n\n"
+    "Please provide a corrected response that matches the schema exactly.\n"
+    "Pay attention to data types (string, number, array, object, boolean, null)."
+)
 
 
 class SchemaValidator:
     """Validates data against JSON Schema specifications."""
 
     @staticmethod
-    def validate(data: Any, schema: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+    def clear_cache() -> None:
+        """Drop all cached per-schema lookups."""
+        _schema_cache.clear()
+        _compile_validator.cache_clear()
+
+    @staticmethod
+    def check_schema(schema: Dict[str, Any]) -> Optional[str]:
+        """
+        Check that a schema is itself valid, compiling it for later use.
+
+        Args:
+            schema: JSON Schema definition
+
+        Returns:
+            None if the schema is valid, else an "Invalid schema: ..." message
+
+        Examples:
+            >>> SchemaValidator.check_schema({"type": "object"}) is None
+            True
+            >>> SchemaValidator.check_schema({"type": "not-a-type"})
+            "Invalid schema: 'not-a-type' is not valid under any of the given schemas"
+        """
+        try:
+            _cached(schema, "validator", _build_validator)
+        except jsonschema.exceptions.SchemaError as e:
+            return f"Invalid schema: {e.message}"
+        return None
+
+    @staticmethod
+    def validate(
+        data: Any,
+        schema: Dict[str, Any],
+        fail_fast: bool = False
+    ) -> Tuple[bool, Optional[str]]:
         """
         Validate data against JSON Schema.
 
         Args:
             data: Data to validate
             schema: JSON Schema definition (Draft 7)
+            fail_fast: Stop at the first error found instead of collecting
+                       all errors to pick the most relevant one
 
         Returns:
             Tuple of (is_valid, error_message)
@@ -35,16 +270,79 @@ class SchemaValidator:
             >>> validator.validate({"name": 123}, schema)
             (False, "123 is not of type 'string'")
         """
+        # Compile (and so check) the schema first, so an invalid schema is
+        # reported the same way by every entry point
         try:
-            jsonschema.validate(instance=data, schema=schema)
+            validator = _cached(schema, "validator", _build_validator)
+        except jsonschema.exceptions.SchemaError as e:
+            return False, f"Invalid schema: {e.message}"
+
+        fast_check = _cached(schema, "fast_check", _build_fast_check)
+        if fast_check is not None and fast_check(data):
             return True, None
-        except jsonschema.exceptions.ValidationError as e:
+
+        if fail_fast:
+            # iter_errors is lazy, so this stops traversal at the first error
+            error = next(validator.iter_errors(data), None)
+        else:
             # Extract the most relevant error message
-            error_path = " -> ".join(str(p) for p in e.path) if e.path else "root"
-            error_msg = f"Validation error at '{error_path}': {e.message}"
-            return False, error_msg
+            error = jsonschema.exceptions.best_match(validator.iter_errors(data))
+
+        if error is not None:
+            return False, _format_error(error)
+        return True, None
+
+    @staticmethod
+    def validate_many(
+        items: List[Any],
+        schema: Dict[str, Any]
+    ) -> Tuple[List[bool], List[Optional[str]]]:
+        """
+        Validate a batch of items that share one schema.
+
+        The schema is checked and compiled once for the whole batch.
+
+        Args:
+            items: Items to validate
+            schema: JSON Schema each item must match
+
+        Returns:
+            Tuple of (valid_mask, errors), parallel to items
+            - valid_mask[i] is True if items[i] is valid
+            - errors[i] is None if valid, else the error message
+
+        Examples:
+            >>> mask, errors = SchemaValidator.validate_many(
+            ...     [{"name": "John"}, {"name": 1}],
+            ...     {"type": "object", "properties": {"name": {"type": "string"}}}
+            ... )
+            >>> mask
+            [True, False]
+        """
+        try:
+            validator = _cached(schema, "validator", _build_validator)
         except jsonschema.exceptions.SchemaError as e:
-            return False, f"Invalid schema: {e.message}"
+            error_msg = f"Invalid schema: {e.message}"
+            return [False] * len(items), [error_msg] * len(items)
+
+        fast_check = _cached(schema, "fast_check", _build_fast_check)
+
+        mask = []
+        errors = []
+        for item in items:
+            if fast_check is not None and fast_check(item):
+                mask.append(True)
+                errors.append(None)
+                continue
+
+            error = jsonschema.exceptions.best_match(validator.iter_errors(item))
+            if error is None:
+                mask.append(True)
+                errors.append(None)
+            else:
+                mask.append(False)
+                errors.append(_format_error(error))
+        return mask, errors
 
     @staticmethod
     def validate_with_details(data: Any, schema: Dict[str, Any]) -> Dict[str, Any]:
@@ -79,17 +377,34 @@ class SchemaValidator:
             >>> len(result["errors"])
             1
         """
-        validator = jsonschema.Draft7Validator(schema)
-        errors = []
+        try:
+            validator = _cached(schema, "validator", _build_validator)
+        except jsonschema.exceptions.SchemaError as e:
+            return {
+                "valid": False,
+                "errors": [{
+                    "path": "root",
+                    "message": f"Invalid schema: {e.message}",
+                    "validator": "schema",
+                    "value": schema
+                }],
+                "data": data
+            }
+
+        fast_check = _cached(schema, "fast_check", _build_fast_check)
+        if fast_check is not None and fast_check(data):
+            return {"valid": True, "errors": [], "data": data}
 
-        for error in validator.iter_errors(data):
-            error_path = " -> ".join(str(p) for p in error.path) if error.path else "root"
-            errors.append({
-                "path": error_path,
-                "message": error.message,
-                "validator": error.validator,
-                "value": error.instance
-            })
+        # Single traversal: iter_errors yields every error in one pass
+        errors = [
+            {
+                "path": " -> ".join(map(str, path)) if path else "root",
+                "message": message,
+                "validator": keyword,
+                "value": instance
+            }
+            for path, message, keyword, instance in map(_error_fields, validator.iter_errors(data))
+        ]
 
         return {
             "valid": len(errors) == 0,
@@ -98,7 +413,7 @@ class SchemaValidator:
         }
 
     @staticmethod
-    def get_required_fields(schema: Dict[str, Any]) -> list[str]:
+    def get_required_fields(schema: Dict[str, Any]) -> frozenset:
         """
         Extract required field names from schema.
 
@@ -106,7 +421,8 @@ class SchemaValidator:
             schema: JSON Schema definition
 
         Returns:
-            List of required field names
+            Frozenset of required field names, shared across calls for the
+            same schema object
 
         Examples:
             >>> schema = {
@@ -115,11 +431,9 @@ class SchemaValidator:
             ...     "required": ["name"]
             ... }
             >>> SchemaValidator.get_required_fields(schema)
-            ['name']
+            frozenset({'name'})
         """
-        if schema.get("type") == "object":
-            return schema.get("required", [])
-        return []
+        return _cached(schema, "required", _build_required)
 
     @staticmethod
     def supports_nullable(schema: Dict[str, Any], field_path: str) -> bool:
@@ -148,19 +462,7 @@ class SchemaValidator:
         """
         # Simple implementation for top-level fields
         # Can be extended to support nested paths
-        if schema.get("type") != "object":
-            return False
-
-        properties = schema.get("properties", {})
-        field_schema = properties.get(field_path, {})
-
-        field_type = field_schema.get("type")
-
-        # Check if type is an array containing "null"
-        if isinstance(field_type, list):
-            return "null" in field_type
-
-        return False
+        return field_path in _cached(schema, "nullable", _build_nullable)
 
     @staticmethod
     def create_error_feedback(
@@ -185,23 +487,11 @@ class SchemaValidator:
             >>> "age" in feedback
             True
         """
-        feedback_lines = [
-            "The previous response had validation errors:",
-            ""
-        ]
-
-        for error in validation_errors:
-            path = error.get("path", "unknown")
-            message = error.get("message", "validation error")
-            feedback_lines.append(f"- Field '{path}': {message}")
-
-        feedback_lines.extend([
-            "",
-            "Please provide a corrected response that matches the schema exactly.",
-            "Pay attention to data types (string, number, array, object, boolean, null)."
-        ])
-
-        return "\n".join(feedback_lines)
+        body = "".join(
+            f"\n- Field '{error.get('path', 'unknown')}': {error.get('message', 'validation error')}"
+            for error in validation_errors
+        )
+        return _FEEDBACK_PREAMBLE + body + _FEEDBACK_EPILOGUE
 
 
 def validate_output(data: Any, schema: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
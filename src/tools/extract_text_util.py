@@ -7,11 +7,20 @@ from pydantic import BaseModel, ValidationError
 logger = structlog.get_logger()
 
 
+_FENCED_BLOCK = re.compile(r"```(?:json)?(.+)```", re.DOTALL)
+_INLINE_CODE = re.compile(r"`(.+)`")
+
+
 def extract_json_str(s: str) -> str:
-    if match := re.search(r"```(?:json)?(.+)```", s, re.DOTALL):
+    # Bare JSON (the usual reply) needs no fence scans over the whole text
+    stripped = s.strip()
+    if stripped[:1] in ("{", "[") and stripped[-1:] in ("}", "]"):
+        return stripped
+
+    if match := _FENCED_BLOCK.search(s):
         return match[1]
 
-    if match := re.search(r"`(.+)`", s):
+    if match := _INLINE_CODE.search(s):
         return match[1]
 
     return s.strip("`")
@@ -56,6 +56,9 @@ class LLMToolExecutor:
         """
         input_data = kwargs.get("input")
 
+        # Validate parameters up front, so bad calls fail before any client setup
+        self.strategy.validate_params(self.template, kwargs)
+
         # Check if input is a simple string (not a list)
         single_input = isinstance(input_data, str)
 
@@ -65,8 +68,9 @@ class LLMToolExecutor:
         else:
             normalized = InputNormalizer.normalize(input_data)
 
-        # Validate parameters
-        self.strategy.validate_params(self.template, kwargs)
+        # Nothing to process - skip the LLM client entirely
+        if not normalized:
+            return []
 
         # Execute using strategy
         results = await self.strategy.execute(
@@ -78,6 +82,10 @@ class LLMToolExecutor:
 
         # For single string input, return just the result value
         if single_input and len(results) > 0:
+            # A single input has no list to report a per-item error in
+            if "error" in results[0]:
+                raise ValueError(results[0]["error"])
+
             result = results[0].get("result")
 
             # If output_format is a string type, MCP requires dict wrapping
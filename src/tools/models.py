@@ -29,6 +29,14 @@ class PromptTemplates(BaseModel):
         default=None,
         description="Alternative system prompt for structured output"
     )
+    batch_system: Optional[str] = Field(
+        default=None,
+        description="System prompt for calls that answer several numbered texts at once"
+    )
+    batch_user: Optional[str] = Field(
+        default=None,
+        description="User prompt template for batched calls, with {text} holding the numbered texts"
+    )
 
 
 class ModelConfig(BaseModel):
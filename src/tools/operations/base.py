@@ -3,10 +3,20 @@ Base operation strategy for LLM tools.
 All operation types must implement this interface.
 """
 
+import asyncio
+import json
+import os
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+import orjson
 
 from ..models import LLMToolTemplate
+from ..extract_text_util import extract_json_str
+
+# Results of deterministic LLM calls, shared by all strategies (most recently used last)
+_response_cache: "OrderedDict[Tuple[Hashable, ...], Dict[str, Any]]" = OrderedDict()
 
 
 class OperationStrategy(ABC):
@@ -15,6 +25,27 @@ class OperationStrategy(ABC):
     Each strategy implements a specific operation type (classify, tag, extract).
     """
 
+    # Default number of items processed concurrently (overridable via args.concurrency)
+    DEFAULT_CONCURRENCY = 8
+
+    # Default number of items sent in one LLM call (overridable via args.batch_size)
+    DEFAULT_BATCH_SIZE = 20
+
+    # Default budget of estimated input tokens per batched call (overridable via args.max_batch_tokens)
+    DEFAULT_MAX_BATCH_TOKENS = 6000
+
+    # Rough characters per token, used to estimate token counts without a tokenizer
+    CHARS_PER_TOKEN = 4
+
+    # Appended to the system prompt when several items share one LLM call
+    BATCH_INSTRUCTIONS = (
+        "You may be given several numbered texts at once. Handle each one independently "
+        "and return ONLY a JSON array with exactly one answer per text, in the same order."
+    )
+
+    # Maximum number of item results kept in the in-memory response cache
+    RESPONSE_CACHE_SIZE = 1024
+
     @abstractmethod
     async def execute(
         self,
@@ -51,3 +82,332 @@ class OperationStrategy(ABC):
         for param_name, param_def in template.parameters.items():
             if param_def.required and param_name not in params:
                 raise ValueError(f"Required parameter '{param_name}' is missing")
+
+    def get_concurrency(self, params: Dict[str, Any]) -> int:
+        """
+        Get the maximum number of items to process concurrently.
+
+        Args:
+            params: Parameters passed to tool call
+
+        Returns:
+            args.concurrency if provided, otherwise DEFAULT_CONCURRENCY (at least 1)
+        """
+        args = params.get("args") or {}
+        return max(1, int(args.get("concurrency", self.DEFAULT_CONCURRENCY)))
+
+    def get_batch_size(self, params: Dict[str, Any]) -> int:
+        """
+        Get the maximum number of items to send in a single LLM call.
+
+        Args:
+            params: Parameters passed to tool call
+
+        Returns:
+            args.batch_size if provided, otherwise DEFAULT_BATCH_SIZE (at least 1)
+        """
+        args = params.get("args") or {}
+        return max(1, int(args.get("batch_size", self.DEFAULT_BATCH_SIZE)))
+
+    def get_max_batch_tokens(self, params: Dict[str, Any]) -> int:
+        """
+        Get the budget of estimated input tokens for a single batched LLM call.
+
+        Args:
+            params: Parameters passed to tool call
+
+        Returns:
+            args.max_batch_tokens if provided, otherwise DEFAULT_MAX_BATCH_TOKENS (at least 1)
+        """
+        args = params.get("args") or {}
+        return max(1, int(args.get("max_batch_tokens", self.DEFAULT_MAX_BATCH_TOKENS)))
+
+    def estimate_tokens(self, data: Any) -> int:
+        """
+        Estimate the number of tokens an item's data takes up in a prompt.
+
+        Args:
+            data: Item data
+
+        Returns:
+            Approximate token count (at least 1)
+        """
+        text = data if isinstance(data, str) else str(data)
+        return len(text) // self.CHARS_PER_TOKEN + 1
+
+    def split_batches(
+        self,
+        items: List[Dict[str, Any]],
+        batch_size: int,
+        max_batch_tokens: Optional[int] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Group consecutive items into batches.
+
+        A batch is sealed when it holds `batch_size` items or when the next
+        item would take its estimated tokens past `max_batch_tokens`. An item
+        over the budget on its own gets a batch to itself.
+
+        Args:
+            items: Normalized {"id", "data"} items
+            batch_size: Maximum number of items per batch
+            max_batch_tokens: Maximum estimated input tokens per batch, or None for no limit
+
+        Returns:
+            Batches of items, in input order
+        """
+        batches: List[List[Dict[str, Any]]] = []
+        current: List[Dict[str, Any]] = []
+        tokens = 0
+        for item in items:
+            item_tokens = self.estimate_tokens(item["data"]) if max_batch_tokens else 0
+            if current and (
+                len(current) >= batch_size
+                or (max_batch_tokens and tokens + item_tokens > max_batch_tokens)
+            ):
+                batches.append(current)
+                current, tokens = [], 0
+            current.append(item)
+            tokens += item_tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def format_batch_texts(self, items: List[Dict[str, Any]]) -> str:
+        """
+        Format items as numbered texts for a batched prompt.
+
+        Args:
+            items: Normalized {"id", "data"} items
+
+        Returns:
+            "[1]\n<data>\n\n[2]\n<data>..." text block
+        """
+        return "\n\n".join(f"[{number}]\n{item['data']}" for number, item in enumerate(items, 1))
+
+    def parse_batch_response(self, response: str, count: int, exact_numbers: bool = False) -> Optional[List[Any]]:
+        """
+        Parse a batched LLM reply into one answer per item.
+
+        A reply cut off mid-array (e.g. at the token limit) yields the answers
+        that were complete before the cut, so only the rest need another call.
+
+        Args:
+            response: Raw LLM response expected to contain a JSON array
+            count: Number of items in the batch
+            exact_numbers: Decode with the stdlib, which keeps integers beyond
+                           64 bits exact (orjson turns them into floats)
+
+        Returns:
+            List of `count` answers, a shorter list of the leading answers from
+            a truncated array, or None if no answers can be used
+        """
+        try:
+            loads = json.loads if exact_numbers else orjson.loads
+            answers = loads(extract_json_str(response))
+        except ValueError:
+            answers = self._decode_array_prefix(response)
+            return answers[:count] or None
+        if not isinstance(answers, list) or len(answers) != count:
+            return None
+        return answers
+
+    @staticmethod
+    def _decode_array_prefix(response: str) -> List[Any]:
+        """Decode the complete leading elements of a truncated JSON array reply.
+
+        Only a reply that itself opens with "[" (optionally inside a code fence)
+        is salvaged, and only elements followed by "," count as complete, so a
+        numbered text answer such as "[1] John Smith" is never read as an array.
+        """
+        text = response.strip()
+        if text.startswith("```"):
+            text = text.split("\n", 1)[-1].lstrip()
+        if not text.startswith("["):
+            return []
+        decoder = json.JSONDecoder()
+        answers = []
+        index = 1
+        while True:
+            while index < len(text) and text[index] in " \t\r\n":
+                index += 1
+            try:
+                answer, index = decoder.raw_decode(text, index)
+            except ValueError:
+                break
+            while index < len(text) and text[index] in " \t\r\n":
+                index += 1
+            # A "]" here means the array closed with text after it, not a cut-off reply
+            if text[index:index + 1] == "]":
+                return []
+            if text[index:index + 1] != ",":
+                break
+            answers.append(answer)
+            index += 1
+        return answers
+
+    async def run_batched(
+        self,
+        items: List[Dict[str, Any]],
+        run_batch: Callable[[List[Dict[str, Any]]], Awaitable[Optional[List[Any]]]],
+        run_item: Callable[[Dict[str, Any]], Awaitable[Any]],
+        batch_size: int,
+        concurrency: int,
+        max_batch_tokens: Optional[int] = None,
+        group_by_length: bool = False,
+    ) -> List[Any]:
+        """
+        Process items in batches of up to `batch_size` items (and, if given,
+        `max_batch_tokens` estimated tokens) per LLM call.
+
+        A batch whose reply can't be used (run_batch returns None) falls back to
+        run_item for each of its items; a partial reply (fewer results than
+        items) falls back only for the items left unanswered. At most `concurrency` LLM calls are in
+        flight at once, counting both batch and per-item calls.
+
+        Args:
+            items: Normalized {"id", "data"} items
+            run_batch: Async function returning results for the batch's leading items, or None
+            run_item: Async function returning the result for a single item
+            batch_size: Maximum number of items per batch
+            concurrency: Maximum number of LLM calls in flight
+            max_batch_tokens: Maximum estimated input tokens per batch, or None for no limit
+            group_by_length: Batch items of similar estimated length together, so a
+                             long text doesn't hold up (or crowd out) many short ones
+
+        Returns:
+            Results in the same order as items
+        """
+        if group_by_length and len(items) > 1:
+            order = sorted(range(len(items)), key=lambda index: self.estimate_tokens(items[index]["data"]))
+            grouped = await self.run_batched(
+                [items[index] for index in order], run_batch, run_item, batch_size, concurrency, max_batch_tokens
+            )
+            results: List[Any] = [None] * len(items)
+            for index, result in zip(order, grouped):
+                results[index] = result
+            return results
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def limited(fn: Callable[[Any], Awaitable[Any]], arg: Any) -> Any:
+            async with semaphore:
+                return await fn(arg)
+
+        async def process(batch: List[Dict[str, Any]]) -> List[Any]:
+            results: List[Any] = []
+            if len(batch) > 1:
+                results = await limited(run_batch, batch) or []
+            rest = batch[len(results):]
+            return results + list(await asyncio.gather(*(limited(run_item, item) for item in rest)))
+
+        batches = self.split_batches(items, batch_size, max_batch_tokens)
+        nested = await asyncio.gather(*(process(batch) for batch in batches))
+        return [result for results in nested for result in results]
+
+    def use_response_cache(self, temperature: Optional[float]) -> bool:
+        """
+        Check whether results may be served from the response cache.
+
+        Only deterministic calls (temperature 0) are cached, and setting
+        LLM_RESPONSE_CACHE_DISABLE=1 turns the cache off entirely.
+
+        Args:
+            temperature: Sampling temperature of the LLM calls
+
+        Returns:
+            True if the response cache should be used
+        """
+        return not temperature and os.getenv("LLM_RESPONSE_CACHE_DISABLE") != "1"
+
+    async def run_cached(
+        self,
+        items: List[Dict[str, Any]],
+        key: Tuple[Hashable, ...],
+        run: Callable[[List[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Serve items from the response cache and run only the misses.
+
+        Results with an "error" key are not cached.
+
+        Args:
+            items: Normalized {"id", "data"} items
+            key: Everything besides the item data that determines the result
+                 (prompts, choices, model, ...)
+            run: Async function returning one {"id", "result"} dict per item, in order
+
+        Returns:
+            Results in the same order as items
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        missing: List[int] = []
+        item_keys = []
+        for index, item in enumerate(items):
+            item_key = key + (self._data_key(item["data"]),)
+            item_keys.append(item_key)
+            cached = _response_cache.get(item_key)
+            if cached is None:
+                missing.append(index)
+            else:
+                _response_cache.move_to_end(item_key)
+                results[index] = {"id": item["id"], **cached}
+
+        if missing:
+            fresh = await run([items[index] for index in missing])
+            for index, result in zip(missing, fresh):
+                results[index] = result
+                if "error" not in result:
+                    _response_cache[item_keys[index]] = {k: v for k, v in result.items() if k != "id"}
+            while len(_response_cache) > self.RESPONSE_CACHE_SIZE:
+                _response_cache.popitem(last=False)
+
+        return results
+
+    async def run_deduplicated(
+        self,
+        items: List[Dict[str, Any]],
+        run: Callable[[List[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Run each distinct item data once and copy the result to its duplicates.
+
+        Args:
+            items: Normalized {"id", "data"} items
+            run: Async function returning one {"id", "result"} dict per item, in order
+
+        Returns:
+            Results in the same order as items, each carrying its own item's id
+        """
+        positions: Dict[Tuple[str, str], int] = {}
+        unique: List[Dict[str, Any]] = []
+        slots: List[int] = []
+        for item in items:
+            data_key = self._data_key(item["data"])
+            if data_key not in positions:
+                positions[data_key] = len(unique)
+                unique.append(item)
+            slots.append(positions[data_key])
+
+        if len(unique) == len(items):
+            return await run(items)
+
+        results = await run(unique)
+        return [{**results[slot], "id": item["id"]} for item, slot in zip(items, slots)]
+
+    @staticmethod
+    def _data_key(data: Any) -> Tuple[str, str]:
+        """Hashable key identifying an item's data, distinguishing text from other values."""
+        if isinstance(data, str):
+            # Tagged so the text "1" doesn't share a key with the number 1
+            return ("s", data)
+        try:
+            return ("j", orjson.dumps(data, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS, default=str).decode())
+        except TypeError:
+            # orjson rejects integers beyond 64 bits; the stdlib encoder handles them
+            return ("j", json.dumps(data, sort_keys=True, default=str))
+
+    @staticmethod
+    def clear_response_cache() -> None:
+        """Drop every cached result."""
+        _response_cache.clear()
@@ -4,10 +4,11 @@ Extracts item_to_extract from text (simple item_to_extract or structured schema)
 """
 
 import json
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 from .base import OperationStrategy
 from ..models import LLMToolTemplate
+from ...services import InputNormalizer
 from ..extract_text_util import extract_json_str
 
 
@@ -45,50 +46,114 @@ class ExtractionOperation(OperationStrategy):
         # Determine if using structured output
         use_structured = template.prompt_templates.structured_system is not None and schema
 
-        results = []
-        for item in normalized_input:
+        # Everything but the item text is the same for every item, so build it once
+        if use_structured:
+            structured_system = self._structured_system_prompt(template, schema, params)
+        else:
+            field_system, field_vars = self._field_prompt(template, field_name, params)
+            field_batch_system, _ = self._field_prompt(template, field_name, params, batch=True)
+
+        # Clean texts before dispatch: fewer prompt tokens, and texts differing only
+        # in whitespace or Unicode form share one dedup/cache entry
+        normalized_input = [
+            {**item, "data": InputNormalizer.clean_text(item["data"])} if isinstance(item["data"], str) else item
+            for item in normalized_input
+        ]
+
+        # Get model config
+        args = params.get("args") or {}
+        model = args.get("model", template.llm_config.model)
+        temperature = args.get("temperature", template.llm_config.temperature)
+
+        def build_messages(text: str) -> List[Dict[str, str]]:
             if use_structured:
-                # Use structured output with schema
-                result = await self._extract_structured(
-                    llm_client, template, item, schema, params
-                )
-                # Return JSON string for structured extraction
-                result_str = json.dumps(result)
-            else:
-                # Use simple field extraction - returns plain text value
-                result = await self._extract_field_value(
-                    llm_client, template, item, field_name, params
-                )
-                # Return plain text value directly
-                result_str = result
-
-            results.append({"id": item["id"], "result": result_str})
-
-        return results
-
-    async def _extract_field_value(
+                return self._structured_messages(structured_system, text)
+            return self._field_messages(template.prompt_templates.user, field_system, field_vars, text)
+
+        def build_batch_messages(text: str) -> List[Dict[str, str]]:
+            if use_structured:
+                messages = self._structured_messages(structured_system, text)
+                messages[0]["content"] += f"\n\n{self.BATCH_INSTRUCTIONS}"
+                return messages
+            # Batched calls need their own prompts: the single-item ones ask for plain text
+            user_template = template.prompt_templates.batch_user or template.prompt_templates.user
+            return self._field_messages(user_template, field_batch_system, field_vars, text)
+
+        async def call_llm(messages: List[Dict[str, str]]) -> str:
+            return await llm_client.chat(messages=messages, model=model, temperature=temperature)
+
+        def to_result(item: Dict[str, Any], value: Any) -> Dict[str, Any]:
+            # Structured extraction returns a JSON string, simple extraction the plain text value
+            return {"id": item["id"], "result": json.dumps(value) if use_structured else value}
+
+        async def extract_item(item: Dict[str, Any]) -> Dict[str, Any]:
+            response = await call_llm(build_messages(item["data"]))
+            if use_structured:
+                return to_result(item, self._parse_structured(response))
+            # Return the plain text value (strip whitespace)
+            return to_result(item, response.strip())
+
+        async def extract_batch(batch: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+            # Several items in one call; None makes run_batched retry them one by one
+            messages = build_batch_messages(self.format_batch_texts(batch))
+            # Extracted data is returned to the caller, so numbers must survive exactly
+            answers = self.parse_batch_response(await call_llm(messages), len(batch), exact_numbers=use_structured)
+            if answers is None:
+                return None
+            if not use_structured:
+                answers = [self._batch_field_value(answer) for answer in answers]
+                if any(answer is None for answer in answers):
+                    return None
+            return [to_result(item, answer) for item, answer in zip(batch, answers)]
+
+        async def extract_unique(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            return await self.run_batched(
+                items,
+                extract_batch,
+                extract_item,
+                self.get_batch_size(params),
+                self.get_concurrency(params),
+                self.get_max_batch_tokens(params),
+            )
+
+        async def extract_all(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            # Identical texts (e.g. the same article under several ids) are extracted once
+            return await self.run_deduplicated(items, extract_unique)
+
+        if not self.use_response_cache(temperature):
+            return await extract_all(normalized_input)
+        # Everything besides the item text that shapes the prompt: field or schema, entity, date, prompt
+        request = {key: value for key, value in params.items() if key not in ("input", "args")}
+        cache_key = (
+            "extraction",
+            template.prompt_templates.system,
+            template.prompt_templates.user,
+            self._data_key(request),
+            model,
+        )
+        return await self.run_cached(normalized_input, cache_key, extract_all)
+
+    def _field_prompt(
         self,
-        llm_client: Any,
         template: LLMToolTemplate,
-        item: Dict[str, Any],
         field_name: str,
-        params: Dict[str, Any]
-    ) -> str:
-        """Extract a single field value as plain text."""
+        params: Dict[str, Any],
+        batch: bool = False
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Build the system prompt and the item-independent user prompt variables for field extraction."""
 
         # Build prompts from template
-        system_prompt = template.prompt_templates.system
+        prompts = template.prompt_templates
+        system_prompt = prompts.system
+        if batch:
+            system_prompt = prompts.batch_system or f"{prompts.system}\n\n{self.BATCH_INSTRUCTIONS}"
 
         # Prepare format variables - include all params plus standard ones
-        format_vars = {
-            "item_to_extract": field_name,
-            "text": item["data"],
-            "input": item["data"],  # Support both 'text' and 'input'
-        }
+        format_vars = {"item_to_extract": field_name}
 
         # Add all other parameters from params (like entity_to_extract, date, etc.)
         for key, value in params.items():
-            if key not in ["args", "prompt", "response_format"] and value is not None:
+            if key not in ["args", "prompt", "response_format", "input"] and value is not None:
                 # Format the value appropriately (e.g., "Date: 2024" or empty string if not provided)
                 if key == "date" and value:
                     format_vars[key] = f"Date: {value}\n\n"
@@ -99,133 +164,68 @@ class ExtractionOperation(OperationStrategy):
         if "date" not in format_vars or not format_vars.get("date"):
             format_vars["date"] = ""
 
-        # Format user prompt with all variables
-        user_prompt = template.prompt_templates.user.format(**format_vars)
-
         # Add custom prompt if provided
         if params.get("prompt"):
             system_prompt += f"\n\n{params['prompt']}"
 
-        # Get model config
-        args = params.get("args") or {}
-        model = args.get("model", template.llm_config.model)
-        temperature = args.get("temperature", template.llm_config.temperature)
-
-        # Call LLM
-        response = await llm_client.chat(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            model=model,
-            temperature=temperature
-        )
+        return system_prompt, format_vars
 
-        # Return the plain text value (strip whitespace)
-        return response.strip()
-
-    async def _extract_items(
+    def _field_messages(
         self,
-        llm_client: Any,
-        template: LLMToolTemplate,
-        item: Dict[str, Any],
-        item_to_extract: List[str],
-        params: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """Extract simple item_to_extract from text."""
-
-        # Build prompts from template
-        system_prompt = template.prompt_templates.system
-
-        # Format user prompt with item_to_extract and data
-        user_prompt = template.prompt_templates.user.format(
-            item_to_extract=", ".join(item_to_extract), text=item["data"]
-        )
-
-        # Add custom prompt if provided
-        if params.get("prompt"):
-            system_prompt += f"\n\n{params['prompt']}"
-
-        # Get model config
-        args = params.get("args") or {}
-        model = args.get("model", template.llm_config.model)
-        temperature = args.get("temperature", template.llm_config.temperature)
-
-        # Call LLM
-        response = await llm_client.chat(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            model=model,
-            temperature=temperature
-        )
-
-        # Parse JSON response - use robust extraction
-        try:
-            json_str = extract_json_str(response)
-            result = json.loads(json_str)
-        except (json.JSONDecodeError, ValueError):
-            # If not valid JSON, try to extract from text
-            result = self._parse_text_extraction(response, item_to_extract)
-
-        return result
-
-    async def _extract_structured(
+        user_template: str,
+        system_prompt: str,
+        format_vars: Dict[str, Any],
+        text: str
+    ) -> List[Dict[str, str]]:
+        """Build the chat messages for extracting a single field value from one text."""
+        # Support both 'text' and 'input' placeholders for the item text
+        user_prompt = user_template.format(**format_vars, text=text, input=text)
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    def _batch_field_value(self, answer: Any) -> Optional[str]:
+        """Convert one answer of a batched field extraction to plain text, or None if unusable."""
+        if isinstance(answer, str):
+            return answer.strip()
+        if answer is None:
+            # Same as the "null" a single-item call returns for a missing field
+            return "null"
+        # The batch prompt asks for strings; anything else is retried one item at a time
+        return None
+
+    def _structured_system_prompt(
         self,
-        llm_client: Any,
         template: LLMToolTemplate,
-        item: Dict[str, Any],
         schema: Dict[str, Any],
         params: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """Extract using structured output with JSON schema."""
+    ) -> str:
+        """Build the system prompt for structured extraction, including the JSON schema."""
 
         # Use structured system prompt
         system_prompt = template.prompt_templates.structured_system or template.prompt_templates.system
 
-        # Format user prompt - use custom format for schema
-        user_prompt = f"Schema:\n{json.dumps(schema, indent=2)}\n\nText:\n{item['data']}\n\nExtracted data (as JSON):"
-
         # Add custom prompt if provided
         if params.get("prompt"):
             system_prompt += f"\n\n{params['prompt']}"
 
-        # Get model config
-        args = params.get("args") or {}
-        model = args.get("model", template.llm_config.model)
-        temperature = args.get("temperature", template.llm_config.temperature)
+        # The schema is the same for every item, so it goes in the system prompt
+        # where it forms part of the cacheable prefix
+        return f"{system_prompt}\n\nSchema:\n{json.dumps(schema, indent=2)}"
 
-        # Call LLM with structured output
-        response = await llm_client.chat(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            model=model,
-            temperature=temperature
-        )
+    def _structured_messages(self, system_prompt: str, text: str) -> List[Dict[str, str]]:
+        """Build the chat messages for extracting structured output from one text."""
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"Text:\n{text}\n\nExtracted data (as JSON):"}
+        ]
 
+    def _parse_structured(self, response: str) -> Any:
+        """Parse a structured extraction response as JSON."""
         # Parse JSON response - use robust extraction
         try:
             json_str = extract_json_str(response)
-            result = json.loads(json_str)
-        except (json.JSONDecodeError, ValueError) as e:
+            return json.loads(json_str)
+        except ValueError as e:
             raise ValueError(f"LLM did not return valid JSON: {response}") from e
-
-        return result
-
-    def _parse_text_extraction(self, response: str, item_to_extract: List[str]) -> Dict[str, Any]:
-        """Fallback: Parse extraction from text if not JSON."""
-        result = {}
-        lines = response.strip().split("\n")
-
-        for line in lines:
-            for field in item_to_extract:
-                # Try to find "field: value" pattern
-                if line.lower().startswith(field.lower() + ":"):
-                    value = line.split(":", 1)[1].strip()
-                    result[field] = value
-                    break
-
-        return result
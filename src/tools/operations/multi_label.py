@@ -3,11 +3,27 @@ Multi-label operation strategy.
 Picks MULTIPLE options from a list (tag, label, etc.).
 """
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+from openai import (
+    APIError,
+    AuthenticationError,
+    BadRequestError,
+    NotFoundError,
+    PermissionDeniedError,
+)
 
 from .base import OperationStrategy
 from ..models import LLMToolTemplate
 
+# Failures that would repeat for every item (bad key, model or request), so they fail the call
+_FATAL_ERRORS = (AuthenticationError, PermissionDeniedError, NotFoundError, BadRequestError)
+
+# Failures confined to one request, reported against the item(s) it covered.
+# Only API errors: a ValueError from the client (e.g. no API key) would repeat for every item
+_ITEM_ERRORS = (APIError,)
+
 
 class MultiLabelOperation(OperationStrategy):
     """
@@ -24,61 +40,178 @@ class MultiLabelOperation(OperationStrategy):
     ) -> List[Dict[str, Any]]:
         """Execute multi-label tagging."""
 
-        # Find the parameter containing choices (tags, labels, options, etc.)
-        choices_param = self._find_choices_param(template)
-        choices = params.get(choices_param, [])
-
-        # Convert comma-separated string to list
-        if isinstance(choices, str):
-            choices = [c.strip() for c in choices.split(",") if c.strip()]
-
-        if not choices or len(choices) < 1:
-            raise ValueError(f"{choices_param} must have at least 1 item")
+        choices_param, choices = self._get_choices(template, params)
 
         # Get max_tags limit if specified (from args)
         args = params.get("args") or {}
         max_tags = args.get("max_tags")
 
-        results = []
-        for item in normalized_input:
-            # Build prompts from template
-            system_prompt = template.prompt_templates.system
+        # Build the parts of the request that are the same for every item
+        prompts = template.prompt_templates
+        system_prompt = prompts.system
 
-            # Add max_tags instruction if specified
-            if max_tags:
-                system_prompt += f"\n\nReturn at most {max_tags} labels."
+        # Batched calls need their own instructions: the single-item prompt asks
+        # for a plain comma-separated list, not a JSON array
+        batch_system_prompt = prompts.batch_system or (
+            f"{prompts.system}\n\n{self.BATCH_INSTRUCTIONS} "
+            "Each answer is the comma-separated list of labels for that text."
+        )
+        batch_user_template = prompts.batch_user or prompts.user
 
-            # Format user prompt with choices and data
-            user_prompt = template.prompt_templates.user.format(
-                **{choices_param: ", ".join(choices), "text": item["data"]}
-            )
+        # Add max_tags instruction if specified
+        if max_tags:
+            system_prompt += f"\n\nReturn at most {max_tags} labels."
+            batch_system_prompt += f"\n\nReturn at most {max_tags} labels per text."
+
+        # Add custom prompt if provided
+        if params.get("prompt"):
+            system_prompt += f"\n\n{params['prompt']}"
+            batch_system_prompt += f"\n\n{params['prompt']}"
+
+        # The choices are the same for every item, so unless the user prompt places them
+        # itself they go in the system prompt, keeping the shared prompt prefix cacheable
+        choices_str = ", ".join(choices)
+        choice_lookup = self._choice_lookup(choices)
+        if f"{{{choices_param}}}" not in prompts.user:
+            system_prompt += f"\n\nAvailable {choices_param}: {choices_str}"
+        if f"{{{choices_param}}}" not in batch_user_template:
+            batch_system_prompt += f"\n\nAvailable {choices_param}: {choices_str}"
 
-            # Add custom prompt if provided
-            if params.get("prompt"):
-                system_prompt += f"\n\n{params['prompt']}"
+        # Get model config from params or template
+        model = args.get("model", template.llm_config.model)
+        temperature = args.get("temperature", template.llm_config.temperature)
 
-            # Get model config from params or template
-            args = params.get("args") or {}
-            model = args.get("model", template.llm_config.model)
-            temperature = args.get("temperature", template.llm_config.temperature)
+        # Optionally have the provider constrain answers to the choices (OpenAI structured outputs)
+        constrained = bool(args.get("constrain_tags"))
+        item_format = self._labels_response_format(choices, batch=False) if constrained else None
+        batch_format = self._labels_response_format(choices, batch=True) if constrained else None
 
-            # Call LLM
-            response = await llm_client.chat(
+        def has_max_tags(text: str) -> bool:
+            # Only labels followed by a comma are complete while the answer is streaming
+            return len(self._parse_labels(text.rpartition(",")[0], choice_lookup, max_tags)) >= max_tags
+
+        async def call_llm(
+            system: str,
+            user_template: str,
+            text: str,
+            response_format: Optional[Dict[str, Any]] = None,
+            stop_early: bool = False,
+        ) -> str:
+            # Format user prompt with choices and data
+            user_prompt = user_template.format(
+                **{choices_param: choices_str, "text": text}
+            )
+            options = {"response_format": response_format} if response_format else {}
+            if stop_early:
+                # Stop generating once max_tags labels have been returned
+                options["stop_when"] = has_max_tags
+            return await llm_client.chat(
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": system},
                     {"role": "user", "content": user_prompt}
                 ],
                 model=model,
-                temperature=temperature
+                temperature=temperature,
+                **options
             )
 
+        def to_result(item: Dict[str, Any], answer: str) -> Dict[str, Any]:
             # Parse response - expect comma-separated list
-            result_labels = self._parse_labels(response, choices, max_tags)
-
+            result_labels = self._parse_labels(answer, choice_lookup, max_tags)
             # Return comma-separated string instead of array
-            results.append({"id": item["id"], "result": ",".join(result_labels)})
+            return {"id": item["id"], "result": ",".join(result_labels)}
+
+        async def tag_item(item: Dict[str, Any]) -> Dict[str, Any]:
+            try:
+                response = await call_llm(
+                    system_prompt,
+                    prompts.user,
+                    item["data"],
+                    item_format,
+                    stop_early=bool(max_tags) and not constrained,
+                )
+                if constrained:
+                    labels = self._batch_labels(self._constrained_value(response, "labels"))
+                    if labels is not None:
+                        response = labels
+                return to_result(item, response)
+            except _FATAL_ERRORS:
+                raise
+            except _ITEM_ERRORS as e:
+                # One failing item must not fail the whole list
+                return {"id": item["id"], "result": None, "error": str(e)}
 
-        return results
+        async def tag_batch(batch: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+            # Several items in one call; None makes run_batched retry them one by one
+            try:
+                response = await call_llm(
+                    batch_system_prompt, batch_user_template, self.format_batch_texts(batch), batch_format
+                )
+            except _FATAL_ERRORS:
+                raise
+            except _ITEM_ERRORS:
+                # Retried per item, so each failure is reported against its own item
+                return None
+            if constrained:
+                answers = self._constrained_value(response, "answers")
+                if not isinstance(answers, list) or len(answers) != len(batch):
+                    answers = None
+            else:
+                answers = self.parse_batch_response(response, len(batch))
+            if answers is None:
+                return None
+            answers = [self._batch_labels(answer) for answer in answers]
+            if any(answer is None for answer in answers):
+                return None
+            return [to_result(item, answer) for item, answer in zip(batch, answers)]
+
+        async def tag_unique(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            return await self.run_batched(
+                items,
+                tag_batch,
+                tag_item,
+                self.get_batch_size(params),
+                self.get_concurrency(params),
+                self.get_max_batch_tokens(params),
+                group_by_length=True,
+            )
+
+        async def tag_all(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            # Identical texts are tagged once and the result copied to every id
+            return await self.run_deduplicated(items, tag_unique)
+
+        # Blank texts can't match any tag, so they skip the LLM
+        has_text = [not self._is_blank(item["data"]) for item in normalized_input]
+        pending = [item for item, keep in zip(normalized_input, has_text) if keep]
+        if self.use_response_cache(temperature):
+            # The system prompt carries the tags, max_tags and custom prompt
+            cache_key = ("multi_label", template.prompt_templates.user, system_prompt, choices_str, model, constrained)
+            tagged = iter(await self.run_cached(pending, cache_key, tag_all))
+        else:
+            tagged = iter(await tag_all(pending))
+        return [
+            next(tagged) if keep else {"id": item["id"], "result": ""}
+            for item, keep in zip(normalized_input, has_text)
+        ]
+
+    def validate_params(self, template: LLMToolTemplate, params: Dict[str, Any]) -> None:
+        """Validate parameters, including the choices, before any LLM work starts."""
+        super().validate_params(template, params)
+        self._get_choices(template, params)
+
+    def _get_choices(self, template: LLMToolTemplate, params: Dict[str, Any]) -> Tuple[str, List[str]]:
+        """Return the choices parameter name and its parsed, validated list of choices."""
+        # Find the parameter containing choices (tags, labels, options, etc.)
+        choices_param = self._find_choices_param(template)
+        choices = params.get(choices_param, [])
+
+        # Convert comma-separated string to list
+        if isinstance(choices, str):
+            choices = [c.strip() for c in choices.split(",") if c.strip()]
+
+        if not choices or len(choices) < 1:
+            raise ValueError(f"{choices_param} must have at least 1 item")
+        return choices_param, choices
 
     def _find_choices_param(self, template: LLMToolTemplate) -> str:
         """Find the parameter that contains the choices list."""
@@ -88,24 +221,72 @@ class MultiLabelOperation(OperationStrategy):
                 return param_name
         raise ValueError("No choices parameter found in template")
 
+    @staticmethod
+    def _labels_response_format(choices: List[str], batch: bool) -> Dict[str, Any]:
+        """Build a json_schema response_format that only allows labels from the choices."""
+        labels = {"type": "array", "items": {"type": "string", "enum": list(dict.fromkeys(choices))}}
+        if batch:
+            name, properties = "batch_labels", {"answers": {"type": "array", "items": labels}}
+        else:
+            name, properties = "labels", {"labels": labels}
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": name,
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": properties,
+                    "required": list(properties),
+                    "additionalProperties": False,
+                },
+            },
+        }
+
+    @staticmethod
+    def _constrained_value(response: str, key: str) -> Any:
+        """Read a field from a structured-output reply, or None if it isn't one."""
+        try:
+            value = orjson.loads(response)
+        except ValueError:
+            return None
+        return value.get(key) if isinstance(value, dict) else None
+
+    @staticmethod
+    def _is_blank(data: Any) -> bool:
+        """Check whether item data has no text to tag."""
+        return data is None or (isinstance(data, str) and not data.strip())
+
+    @staticmethod
+    def _batch_labels(answer: Any) -> Optional[str]:
+        """Turn one batched answer into comma-separated labels, or None if unusable."""
+        # A model may answer with a list of labels instead of a comma-separated string
+        if isinstance(answer, list) and all(isinstance(label, str) for label in answer):
+            return ",".join(answer)
+        if isinstance(answer, str):
+            return answer
+        return None
+
+    @staticmethod
+    def _choice_lookup(choices: List[str]) -> Dict[str, str]:
+        """Map each lowercased choice to the choice, keeping the first on case collisions."""
+        return {choice.lower(): choice for choice in reversed(choices)}
+
     def _parse_labels(
-        self, response: str, valid_choices: List[str], max_tags: int = None
+        self, response: str, choice_lookup: Dict[str, str], max_tags: int = None
     ) -> List[str]:
-        """Parse comma-separated labels from response."""
+        """Parse comma-separated labels from response, given _choice_lookup of the valid choices."""
         # Split by comma and clean up
         labels = [label.strip() for label in response.split(",")]
 
         # Match to valid choices (case-insensitive)
         matched_labels = []
         for label in labels:
-            label_lower = label.lower()
-            for choice in valid_choices:
-                if choice.lower() == label_lower:
-                    matched_labels.append(choice)
-                    break
-
-        # Apply max_tags limit
-        if max_tags and len(matched_labels) > max_tags:
-            matched_labels = matched_labels[:max_tags]
+            # Apply max_tags limit - the remaining labels can't be used
+            if max_tags and len(matched_labels) >= max_tags:
+                break
+            choice = choice_lookup.get(label.lower())
+            if choice is not None:
+                matched_labels.append(choice)
 
         return matched_labels
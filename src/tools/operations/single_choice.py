@@ -3,7 +3,7 @@ Single choice operation strategy.
 Picks ONE option from a list (classify, categorize, etc.).
 """
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 from .base import OperationStrategy
 from ..models import LLMToolTemplate
@@ -24,55 +24,94 @@ class SingleChoiceOperation(OperationStrategy):
     ) -> List[Dict[str, Any]]:
         """Execute single-choice classification."""
 
-        # Find the parameter containing choices (categories, options, labels, etc.)
-        choices_param = self._find_choices_param(template)
-        choices = params.get(choices_param, [])
+        choices_param, choices = self._get_choices(template, params)
 
-        # Convert comma-separated string to list
-        if isinstance(choices, str):
-            choices = [c.strip() for c in choices.split(",") if c.strip()]
+        # Build the parts of the request that are the same for every item
+        prompts = template.prompt_templates
+        system_prompt = prompts.system
 
-        if not choices or len(choices) < 2:
-            raise ValueError(f"{choices_param} must have at least 2 items")
+        # Batched calls need their own instructions: the single-item prompt asks
+        # for just one category name, which contradicts a JSON array of answers
+        batch_system_prompt = prompts.batch_system or f"{prompts.system}\n\n{self.BATCH_INSTRUCTIONS}"
+        batch_user_template = prompts.batch_user or prompts.user
+
+        # Add custom prompt if provided
+        if params.get("prompt"):
+            system_prompt += f"\n\n{params['prompt']}"
+            batch_system_prompt += f"\n\n{params['prompt']}"
 
-        results = []
-        for item in normalized_input:
-            # Build prompts from template
-            system_prompt = template.prompt_templates.system
+        # Get model config from params or template
+        args = params.get("args") or {}
+        model = args.get("model", template.llm_config.model)
+        temperature = args.get("temperature", template.llm_config.temperature)
+        choices_str = ", ".join(choices)
 
+        async def call_llm(system: str, user_template: str, text: str) -> str:
             # Format user prompt with choices and data
-            user_prompt = template.prompt_templates.user.format(
-                **{choices_param: ", ".join(choices), "text": item["data"]}
+            user_prompt = user_template.format(
+                **{choices_param: choices_str, "text": text}
             )
-
-            # Add custom prompt if provided
-            if params.get("prompt"):
-                system_prompt += f"\n\n{params['prompt']}"
-
-            # Get model config from params or template
-            args = params.get("args") or {}
-            model = args.get("model", template.llm_config.model)
-            temperature = args.get("temperature", template.llm_config.temperature)
-
-            # Call LLM
-            response = await llm_client.chat(
+            return await llm_client.chat(
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": system},
                     {"role": "user", "content": user_prompt}
                 ],
                 model=model,
                 temperature=temperature
             )
 
+        def normalize(item: Dict[str, Any], answer: str) -> Dict[str, Any]:
             # Validate and normalize response
-            result = response.strip()
+            result = answer.strip()
             if result not in choices:
                 # Try case-insensitive match
                 result = self._match_choice(result, choices)
+            return {"id": item["id"], "result": result}
+
+        async def classify_item(item: Dict[str, Any]) -> Dict[str, Any]:
+            return normalize(item, await call_llm(system_prompt, prompts.user, item["data"]))
+
+        async def classify_batch(batch: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+            # Several items in one call; None makes run_batched retry them one by one
+            response = await call_llm(batch_system_prompt, batch_user_template, self.format_batch_texts(batch))
+            answers = self.parse_batch_response(response, len(batch))
+            if answers is None or not all(isinstance(answer, str) for answer in answers):
+                return None
+            return [normalize(item, answer) for item, answer in zip(batch, answers)]
+
+        async def classify_all(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            return await self.run_batched(
+                items,
+                classify_batch,
+                classify_item,
+                self.get_batch_size(params),
+                self.get_concurrency(params),
+                self.get_max_batch_tokens(params),
+            )
+
+        if not self.use_response_cache(temperature):
+            return await classify_all(normalized_input)
+        cache_key = ("single_choice", template.prompt_templates.user, system_prompt, choices_str, model)
+        return await self.run_cached(normalized_input, cache_key, classify_all)
+
+    def validate_params(self, template: LLMToolTemplate, params: Dict[str, Any]) -> None:
+        """Validate parameters, including the choices, before any LLM work starts."""
+        super().validate_params(template, params)
+        self._get_choices(template, params)
+
+    def _get_choices(self, template: LLMToolTemplate, params: Dict[str, Any]) -> Tuple[str, List[str]]:
+        """Return the choices parameter name and its parsed, validated list of choices."""
+        # Find the parameter containing choices (categories, options, labels, etc.)
+        choices_param = self._find_choices_param(template)
+        choices = params.get(choices_param, [])
 
-            results.append({"id": item["id"], "result": result})
+        # Convert comma-separated string to list
+        if isinstance(choices, str):
+            choices = [c.strip() for c in choices.split(",") if c.strip()]
 
-        return results
+        if not choices or len(choices) < 2:
+            raise ValueError(f"{choices_param} must have at least 2 items")
+        return choices_param, choices
 
     def _find_choices_param(self, template: LLMToolTemplate) -> str:
         """Find the parameter that contains the choices list."""
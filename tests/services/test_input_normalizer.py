@@ -10,19 +10,30 @@ From SPECIFICATION.md:
 - Mixed types: Support str, int, float, dict, bool, None
 """
 
+import array
+
 import pytest
 from typing import List, Dict, Any, Union
 
+from src.services.input_normalizer import InputNormalizer
+
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def input_normalizer():
     """
     Fixture that provides the InputNormalizer class.
+
+    Module-scoped: the normalizer is stateless, so one lookup serves every test.
     """
-    from src.services.input_normalizer import InputNormalizer
     return InputNormalizer
 
 
+@pytest.fixture(scope="session")
+def big_input():
+    """Large input list, built once for the whole session."""
+    return [f"item_{i}" for i in range(1000)]
+
+
 class TestInputNormalizerBasic:
     """Basic normalization functionality."""
 
@@ -264,6 +275,18 @@ class TestInputNormalizerDictVariations:
         assert result[0]["data"] == "text"
         # Extra fields might be preserved or stripped depending on implementation
 
+    def test_dict_subclass_treated_as_dict(self, input_normalizer):
+        """Test that dict subclasses take the dict path."""
+        from collections import OrderedDict
+
+        input_data = [OrderedDict(id="custom", data="text"), OrderedDict(name="x")]
+        result = input_normalizer.normalize(input_data)
+
+        assert result[0]["id"] == "custom"
+        assert result[0]["data"] == "text"
+        assert result[1]["id"] == 0
+        assert result[1]["data"] == {"name": "x"}
+
     def test_nested_dict_as_data(self, input_normalizer):
         """Test dict with nested object as data."""
         input_data = [
@@ -301,16 +324,23 @@ class TestInputNormalizerEdgeCases:
         assert result[1]["data"] == "text"
         assert result[2]["data"] == ""
 
-    def test_very_long_list(self, input_normalizer):
+    def test_very_long_list(self, input_normalizer, big_input):
         """Test normalizing large list."""
-        input_data = [f"item_{i}" for i in range(1000)]
-        result = input_normalizer.normalize(input_data)
+        result = input_normalizer.normalize(big_input)
 
         assert len(result) == 1000
         assert result[0]["id"] == 0
         assert result[999]["id"] == 999
         assert result[500]["data"] == "item_500"
 
+    def test_array_like_input(self, input_normalizer):
+        """Test that array-likes with tolist() are accepted."""
+        result = input_normalizer.normalize(array.array("i", [10, 20, 30]))
+
+        assert len(result) == 3
+        assert result[0] == {"id": 0, "data": 10}
+        assert result[2] == {"id": 2, "data": 30}
+
     def test_duplicate_custom_ids(self, input_normalizer):
         """
         Test behavior with duplicate custom IDs.
@@ -360,6 +390,55 @@ class TestInputNormalizerEdgeCases:
             input_normalizer.normalize(123)
 
 
+class TestInputNormalizerColumns:
+    """Tests for the column-oriented output."""
+
+    def test_columns_match_normalize(self, input_normalizer):
+        """Test that columns carry the same ids and data as normalize()."""
+        input_data = [
+            "text",
+            {"id": "custom", "data": "text2"},
+            {"id": 5},
+            {"name": "no id"},
+            None
+        ]
+        ids, data = input_normalizer.normalize_columns(input_data)
+        normalized = input_normalizer.normalize(input_data)
+
+        assert ids == [item["id"] for item in normalized]
+        assert data == [item["data"] for item in normalized]
+
+    def test_columns_empty(self, input_normalizer):
+        """Test columns for empty input."""
+        assert input_normalizer.normalize_columns([]) == ([], [])
+
+    def test_columns_non_list_raises_error(self, input_normalizer):
+        """Test that non-list input raises TypeError."""
+        with pytest.raises(TypeError):
+            input_normalizer.normalize_columns("not a list")
+
+
+class TestInputNormalizerCleanText:
+    """Tests for preparing text for prompts."""
+
+    def test_whitespace_is_collapsed(self, input_normalizer):
+        """Test runs of spaces and tabs become one space and ends are stripped."""
+        assert input_normalizer.clean_text("  a\t\tb   c  ") == "a b c"
+
+    def test_line_breaks_are_kept(self, input_normalizer):
+        """Test line structure survives while spaces around breaks are trimmed."""
+        text = "| name | qty |  \r\n|---|---|\n  | tea |  2 |\n\n\nTotal: 2"
+        assert input_normalizer.clean_text(text) == "| name | qty |\n|---|---|\n| tea | 2 |\n\n\nTotal: 2"
+
+    def test_unicode_is_nfc_normalized(self, input_normalizer):
+        """Test decomposed characters are composed."""
+        assert input_normalizer.clean_text("Cafe\u0301") == "Caf\u00e9"
+
+    def test_cjk_text_is_unchanged(self, input_normalizer):
+        """Test already-clean non-ASCII text passes through."""
+        assert input_normalizer.clean_text("北京是中国的首都") == "北京是中国的首都"
+
+
 class TestInputNormalizerPreserveOrder:
     """Tests to verify order is preserved."""
 
@@ -0,0 +1,206 @@
+"""
+Test cases for llm_client.py
+
+Uses a mock HTTP transport, so no API key or network access is needed.
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from openai import AsyncOpenAI, RateLimitError
+from src.services import llm_client
+from src.services.llm_client import LLMClient
+
+COMPLETION = {
+    "id": "chatcmpl-test",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4o-mini",
+    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "ok"}}],
+}
+
+
+@pytest.fixture
+def make_client(monkeypatch):
+    """Build an LLMClient whose OpenAI requests are answered by a handler."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(llm_client, "RETRY_BASE_DELAY", 0.001)
+
+    def make(handler):
+        client = LLMClient()
+        client.openai_client = AsyncOpenAI(
+            api_key="test-key",
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+            max_retries=0,
+        )
+        return client
+
+    return make
+
+
+def _responses(*statuses):
+    """Handler answering with the given status codes in turn, then 200s."""
+    statuses = list(statuses)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if statuses:
+            return httpx.Response(statuses.pop(0), json={"error": {"message": "try again"}})
+        return httpx.Response(200, json=COMPLETION)
+
+    return handler, calls
+
+
+class TestLLMClientRetries:
+    """Tests for retrying transient failures."""
+
+    async def test_transient_failures_are_retried(self, make_client):
+        """Test 5xx and 429 responses are retried until a success."""
+        handler, calls = _responses(503, 429)
+        client = make_client(handler)
+
+        response = await client.chat([{"role": "user", "content": "hi"}], model="gpt-4o-mini")
+
+        assert response == "ok"
+        assert len(calls) == 3
+
+    async def test_gives_up_after_max_retries(self, make_client):
+        """Test the error is raised once retries are exhausted."""
+        handler, calls = _responses(*[429] * (llm_client.MAX_RETRIES + 1))
+        client = make_client(handler)
+
+        with pytest.raises(RateLimitError):
+            await client.chat([{"role": "user", "content": "hi"}], model="gpt-4o-mini")
+
+        assert len(calls) == llm_client.MAX_RETRIES + 1
+
+    async def test_client_errors_are_not_retried(self, make_client):
+        """Test a 400 response fails on the first attempt."""
+        handler, calls = _responses(400)
+        client = make_client(handler)
+
+        with pytest.raises(Exception):
+            await client.chat([{"role": "user", "content": "hi"}], model="gpt-4o-mini")
+
+        assert len(calls) == 1
+
+    async def test_retry_waits_for_retry_after(self, make_client, monkeypatch):
+        """Test a 429 with retry-after-ms waits at least that long before retrying."""
+        delays = []
+
+        async def sleep(delay):
+            delays.append(delay)
+
+        monkeypatch.setattr(llm_client.asyncio, "sleep", sleep)
+        responses = [httpx.Response(429, headers={"retry-after-ms": "1500"}, json={"error": {"message": "slow down"}})]
+
+        def handler(request):
+            return responses.pop(0) if responses else httpx.Response(200, json=COMPLETION)
+
+        client = make_client(handler)
+
+        assert await client.chat([{"role": "user", "content": "hi"}], model="gpt-4o-mini") == "ok"
+        assert delays == [1.5]
+
+    def test_retry_after_header_forms(self):
+        """Test seconds, milliseconds and out-of-range Retry-After values."""
+        def error(headers):
+            request = httpx.Request("POST", "https://api.test")
+            return RateLimitError("slow down", response=httpx.Response(429, headers=headers, request=request), body=None)
+
+        assert llm_client._retry_after(error({"retry-after": "2"})) == 2.0
+        assert llm_client._retry_after(error({"retry-after-ms": "250"})) == 0.25
+        assert llm_client._retry_after(error({"retry-after": "3600"})) is None
+        assert llm_client._retry_after(error({})) is None
+
+    async def test_rate_limit_shrinks_concurrency_cap(self, make_client):
+        """Test a 429 halves the model's concurrency cap."""
+        handler, _ = _responses(429)
+        client = make_client(handler)
+
+        await client.chat([{"role": "user", "content": "hi"}], model="gpt-4o-mini")
+
+        assert client.limiters["gpt-4o-mini"].limit < llm_client.MAX_CONCURRENCY
+
+    async def test_concurrent_rate_limits_shrink_cap_once(self, make_client):
+        """Test a burst of 429s for requests in flight together halves the cap once."""
+        burst = 8
+        arrived = []
+        all_arrived = asyncio.Event()
+
+        async def handler(request):
+            arrived.append(request)
+            if len(arrived) <= burst:
+                if len(arrived) == burst:
+                    all_arrived.set()
+                await all_arrived.wait()
+                return httpx.Response(429, json={"error": {"message": "slow down"}})
+            return httpx.Response(200, json=COMPLETION)
+
+        client = make_client(handler)
+
+        await asyncio.gather(
+            *(client.chat([{"role": "user", "content": "hi"}], model="gpt-4o-mini") for _ in range(burst))
+        )
+
+        assert client.limiters["gpt-4o-mini"].decreases == 1
+
+
+def _stream_of(*parts):
+    """Handler answering with a server-sent event stream of the given text parts."""
+    def handler(request):
+        events = [
+            "data: " + json.dumps({
+                "id": "chatcmpl-test",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": "gpt-4o-mini",
+                "choices": [{"index": 0, "delta": {"content": part}, "finish_reason": None}],
+            })
+            for part in parts
+        ]
+        body = "\n\n".join(events + ["data: [DONE]"]) + "\n\n"
+        return httpx.Response(200, content=body.encode(), headers={"content-type": "text/event-stream"})
+
+    return handler
+
+
+class TestLLMClientStreaming:
+    """Tests for stopping generation early."""
+
+    async def test_stream_stops_when_condition_is_met(self, make_client):
+        """Test the text received up to the stop condition is returned."""
+        client = make_client(_stream_of("python", ", backend", ", database"))
+
+        response = await client.chat(
+            [{"role": "user", "content": "hi"}], model="gpt-4o-mini", stop_when=lambda text: "," in text
+        )
+
+        assert response == "python, backend"
+
+    async def test_stream_returns_full_text_otherwise(self, make_client):
+        """Test the whole streamed text is returned if the condition never holds."""
+        client = make_client(_stream_of("python", ", backend"))
+
+        response = await client.chat(
+            [{"role": "user", "content": "hi"}], model="gpt-4o-mini", stop_when=lambda text: False
+        )
+
+        assert response == "python, backend"
+
+    async def test_stream_is_read_inside_concurrency_slot(self, make_client):
+        """Test the limiter slot stays held while the stream is being read."""
+        client = make_client(_stream_of("python", ", backend"))
+        in_flight = []
+
+        def stop_when(text):
+            in_flight.append(client.limiters["gpt-4o-mini"].in_flight)
+            return False
+
+        await client.chat([{"role": "user", "content": "hi"}], model="gpt-4o-mini", stop_when=stop_when)
+
+        assert in_flight == [1, 1]
+        assert client.limiters["gpt-4o-mini"].in_flight == 0
@@ -0,0 +1,117 @@
+"""
+Test cases for rate_limiter.py
+
+Tests the AIMD concurrency cap used for LLM requests.
+"""
+
+import asyncio
+
+from src.services.rate_limiter import AdaptiveLimiter
+
+
+class TestAdaptiveLimiterAIMD:
+    """Tests for how the cap adapts."""
+
+    def test_rate_limit_halves_cap(self):
+        """Test a rate-limit rejection halves the cap."""
+        limiter = AdaptiveLimiter(limit=16)
+        limiter.on_rate_limited()
+        assert limiter.limit == 8
+
+    def test_cap_never_drops_below_min(self):
+        """Test repeated rejections stop at min_limit."""
+        limiter = AdaptiveLimiter(limit=4, min_limit=2)
+        for _ in range(5):
+            limiter.on_rate_limited()
+        assert limiter.limit == 2
+
+    def test_success_grows_cap_slowly(self):
+        """Test a full window of successes grows the cap by about one."""
+        limiter = AdaptiveLimiter(limit=4, max_limit=10)
+        for _ in range(4):
+            limiter.on_success()
+        assert 4.9 < limiter.limit < 5.0
+
+    def test_success_never_exceeds_max(self):
+        """Test the cap stops growing at max_limit."""
+        limiter = AdaptiveLimiter(limit=4, max_limit=4)
+        limiter.on_success()
+        assert limiter.limit == 4
+
+    def test_exhausted_quota_header_shrinks_cap(self):
+        """Test a success reporting zero remaining requests halves the cap."""
+        limiter = AdaptiveLimiter(limit=8)
+        limiter.on_success({"x-ratelimit-remaining-requests": "0"})
+        assert limiter.limit == 4
+
+    def test_malformed_header_is_ignored(self):
+        """Test an unparseable quota header counts as a plain success."""
+        limiter = AdaptiveLimiter(limit=8, max_limit=16)
+        limiter.on_success({"x-ratelimit-remaining-requests": "n/a"})
+        assert limiter.limit > 8
+
+
+class TestAdaptiveLimiterSlots:
+    """Tests for the in-flight cap."""
+
+    async def test_slots_cap_in_flight_requests(self):
+        """Test no more than `limit` slots are held at once."""
+        limiter = AdaptiveLimiter(limit=3)
+        peak = 0
+
+        async def request():
+            nonlocal peak
+            async with limiter.slot():
+                peak = max(peak, limiter.in_flight)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(request() for _ in range(10)))
+
+        assert peak == 3
+        assert limiter.in_flight == 0
+
+
+class TestAdaptiveLimiterBursts:
+    """Tests that a burst of concurrent signals counts as one."""
+
+    async def test_concurrent_rejections_halve_cap_once(self):
+        """Test rejections of requests in flight together halve the cap only once."""
+        limiter = AdaptiveLimiter(limit=16)
+        all_started = asyncio.Event()
+
+        async def rejected_request():
+            async with limiter.slot() as started:
+                if limiter.in_flight == 16:
+                    all_started.set()
+                await all_started.wait()
+            limiter.on_rate_limited(started)
+
+        await asyncio.gather(*(rejected_request() for _ in range(16)))
+
+        assert limiter.limit == 8
+
+    async def test_rejection_after_decrease_halves_again(self):
+        """Test a request started after a decrease can shrink the cap further."""
+        limiter = AdaptiveLimiter(limit=16)
+        async with limiter.slot() as started:
+            pass
+        limiter.on_rate_limited(started)
+
+        async with limiter.slot() as started:
+            pass
+        limiter.on_rate_limited(started)
+
+        assert limiter.limit == 4
+
+    async def test_exhausted_quota_burst_halves_cap_once(self):
+        """Test zero-remaining headers on concurrent successes halve the cap once."""
+        limiter = AdaptiveLimiter(limit=8)
+        tickets = []
+        for _ in range(4):
+            async with limiter.slot() as started:
+                tickets.append(started)
+
+        for started in tickets:
+            limiter.on_success({"x-ratelimit-remaining-requests": "0"}, started)
+
+        assert limiter.limit == 4
@@ -4,7 +4,9 @@ Test cases for schema_validator.py
 Tests JSON Schema validation, nested objects, type checking, and error feedback.
 """
 
+import jsonschema
 import pytest
+from src.services import schema_validator
 from src.services.schema_validator import SchemaValidator, validate_output
 
 
@@ -74,6 +76,89 @@ class TestSchemaValidatorBasic:
         assert valid is True
 
 
+class TestSchemaValidatorFastPath:
+    """Test the specialized checker for plain object schemas."""
+
+    SCHEMA = {
+        "type": "object",
+        "properties": {
+            "name": {"type": "string"},
+            "age": {"type": "integer"},
+            "score": {"type": ["number", "null"]},
+            "active": {"type": "boolean"}
+        },
+        "required": ["name"]
+    }
+
+    @pytest.mark.parametrize("data, expected", [
+        ({"name": "John", "age": 30, "score": 1.5, "active": True}, True),
+        ({"name": "John", "score": None}, True),
+        ({"name": "John", "age": 30.0}, True),  # integral float: full validator accepts
+        ({"age": 30}, False),
+        ({"name": "John", "age": True}, False),
+        ({"name": "John", "active": 1}, False),
+        ({"name": "John", "score": "high"}, False),
+        (["name"], False),
+    ])
+    def test_fast_path_agrees_with_full_validation(self, data, expected):
+        """Test that flat schemas give the same verdict as jsonschema."""
+        valid, error = SchemaValidator.validate(data, self.SCHEMA)
+        assert valid is expected
+        assert (error is None) is expected
+
+        full_valid = not list(jsonschema.Draft7Validator(self.SCHEMA).iter_errors(data))
+        assert full_valid is expected
+
+    NESTED_SCHEMA = {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string"},
+            "author": {
+                "type": "object",
+                "properties": {"name": {"type": "string"}, "age": {"type": ["integer", "null"]}},
+                "required": ["name"]
+            },
+            "tags": {"type": "array", "items": {"type": "string"}},
+            "sections": {
+                "type": "array",
+                "items": {"type": "object", "properties": {"heading": {"type": "string"}}, "required": ["heading"]}
+            }
+        },
+        "required": ["title", "author"]
+    }
+
+    @pytest.mark.parametrize("data, expected", [
+        ({"title": "T", "author": {"name": "A"}}, True),
+        ({"title": "T", "author": {"name": "A", "age": None}, "tags": ["x", "y"]}, True),
+        ({"title": "T", "author": {"name": "A"}, "sections": [{"heading": "H"}]}, True),
+        ({"title": "T", "author": {"age": 3}}, False),
+        ({"title": "T", "author": "A"}, False),
+        ({"title": "T", "author": {"name": "A"}, "tags": ["x", 1]}, False),
+        ({"title": "T", "author": {"name": "A"}, "tags": "x"}, False),
+        ({"title": "T", "author": {"name": "A"}, "sections": [{}]}, False),
+    ])
+    def test_nested_fast_path_agrees_with_full_validation(self, data, expected):
+        """Test that nested object and array schemas give the same verdict as jsonschema."""
+        assert schema_validator._build_fast_check(self.NESTED_SCHEMA) is not None
+
+        valid, error = SchemaValidator.validate(data, self.NESTED_SCHEMA)
+        assert valid is expected
+        assert (error is None) is expected
+
+        full_valid = not list(jsonschema.Draft7Validator(self.NESTED_SCHEMA).iter_errors(data))
+        assert full_valid is expected
+
+    def test_non_flat_schema_uses_full_validation(self):
+        """Test that unsupported keywords bypass the fast path."""
+        schema = {
+            "type": "object",
+            "properties": {"name": {"type": "string", "minLength": 3}}
+        }
+        valid, error = SchemaValidator.validate({"name": "Jo"}, schema)
+        assert valid is False
+        assert error is not None
+
+
 class TestSchemaValidatorNestedObjects:
     """Test nested object validation."""
 
@@ -165,6 +250,27 @@ class TestSchemaValidatorArrays:
         valid, error = SchemaValidator.validate(data, schema)
         assert valid is False
 
+    def test_array_of_strings_invalid_fail_fast(self):
+        """Test fail-fast validation reports the first bad item."""
+        schema = {
+            "type": "object",
+            "properties": {
+                "tags": {
+                    "type": "array",
+                    "items": {"type": "string"}
+                }
+            }
+        }
+        data = {"tags": ["python", 123, "go", 456]}
+
+        valid, error = SchemaValidator.validate(data, schema, fail_fast=True)
+        assert valid is False
+        assert "tags -> 1" in error
+
+        valid, error = SchemaValidator.validate({"tags": ["a", "b"]}, schema, fail_fast=True)
+        assert valid is True
+        assert error is None
+
     def test_array_of_objects_valid(self):
         """Test valid array of objects."""
         schema = {
@@ -193,6 +299,85 @@ class TestSchemaValidatorArrays:
         assert valid is True
 
 
+class TestSchemaValidatorBatch:
+    """Test batch validation."""
+
+    def test_validate_many_mask(self):
+        """Test that validate_many returns a mask parallel to the items."""
+        schema = {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "age": {"type": "number"}
+            }
+        }
+        items = [
+            {"name": "John", "age": 30},
+            {"name": "Jane", "age": "old"},
+            {"name": "Bob"}
+        ]
+
+        mask, errors = SchemaValidator.validate_many(items, schema)
+        assert mask == [True, False, True]
+        assert errors[0] is None
+        assert "age" in errors[1]
+        assert errors[2] is None
+
+    def test_validate_many_invalid_schema(self):
+        """Test that an invalid schema marks every item invalid."""
+        mask, errors = SchemaValidator.validate_many([1, 2], {"type": "not-a-type"})
+        assert mask == [False, False]
+        assert all("Invalid schema" in e for e in errors)
+
+
+class TestSchemaValidatorCompiledCache:
+    """Tests for sharing compiled validators between equal schemas."""
+
+    def test_equal_schemas_share_validator(self):
+        """Test that separate but equal schema dicts compile once."""
+        SchemaValidator.clear_cache()
+        first = {"type": "object", "properties": {"tags": {"type": "array"}}}
+        second = {"properties": {"tags": {"type": "array"}}, "type": "object"}
+
+        # Invalid data gets past the fast path, so both calls need the full validator
+        assert SchemaValidator.validate({"tags": "x"}, first)[0] is False
+        assert SchemaValidator.validate({"tags": 1}, second)[0] is False
+
+        info = schema_validator._compile_validator.cache_info()
+        assert info.misses == 1
+        assert info.hits == 1
+
+    def test_check_schema(self):
+        """Test that check_schema reports invalid schemas without raising."""
+        assert SchemaValidator.check_schema({"type": "object"}) is None
+        assert SchemaValidator.check_schema({"type": "not-a-type"}).startswith("Invalid schema")
+
+    def test_schema_that_is_not_plain_json(self):
+        """Test a schema json.dumps can't sort still compiles instead of raising TypeError."""
+        schema = {"type": "object", "properties": {1: {"type": "string"}, "name": {"type": "string"}}}
+
+        assert SchemaValidator.check_schema(schema) is None
+        assert SchemaValidator.validate({"name": 1}, schema)[0] is False
+
+    def test_entry_points_agree_on_invalid_schema(self):
+        """Test data matching a fast-path shape doesn't hide an invalid schema."""
+        schema = {"type": "object", "title": 5, "properties": {"a": {"type": "integer"}}}
+
+        assert SchemaValidator.validate({"a": 1}, schema)[0] is False
+        assert SchemaValidator.validate_with_details({"a": 1}, schema)["valid"] is False
+        assert SchemaValidator.validate_many([{"a": 1}], schema)[0] == [False]
+
+    def test_no_fast_check_for_invalid_nested_schema(self):
+        """Test a nested schema failing check_schema gets no fast path."""
+        schema = {
+            "type": "object",
+            "properties": {"items": {"type": "array", "items": {"type": "object", "title": 5, "properties": {"name": {"type": "string"}}}}},
+        }
+
+        assert schema_validator._build_fast_check(schema) is None
+        assert SchemaValidator.validate({"items": [{"name": "x"}]}, schema)[0] is False
+
+
 class TestSchemaValidatorNullable:
     """Test nullable field support."""
 
@@ -235,6 +420,18 @@ class TestSchemaValidatorNullable:
         assert SchemaValidator.supports_nullable(schema, "name") is True
         assert SchemaValidator.supports_nullable(schema, "age") is False
 
+    def test_supports_nullable_cache_cleared(self):
+        """Test that clear_cache picks up in-place schema changes."""
+        schema = {
+            "type": "object",
+            "properties": {"name": {"type": "string"}}
+        }
+        assert SchemaValidator.supports_nullable(schema, "name") is False
+
+        schema["properties"]["name"]["type"] = ["string", "null"]
+        SchemaValidator.clear_cache()
+        assert SchemaValidator.supports_nullable(schema, "name") is True
+
 
 class TestSchemaValidatorHelpers:
     """Test helper methods."""
@@ -257,6 +454,9 @@ class TestSchemaValidatorHelpers:
         assert "email" in required
         assert "age" not in required
 
+        # Same schema object returns the same cached set
+        assert SchemaValidator.get_required_fields(schema) is required
+
     def test_get_required_fields_empty(self):
         """Test schema with no required fields."""
         schema = {
@@ -285,6 +485,16 @@ class TestSchemaValidatorHelpers:
         assert len(result["errors"]) >= 1
         assert result["data"] == data
 
+        errors_by_path = {e["path"]: e for e in result["errors"]}
+        assert errors_by_path["name"]["validator"] == "type"
+        assert errors_by_path["name"]["value"] == 123
+
+    def test_validate_with_details_invalid_schema(self):
+        """Test that an invalid schema is reported, not raised."""
+        result = SchemaValidator.validate_with_details({}, {"type": "not-a-type"})
+        assert result["valid"] is False
+        assert result["errors"][0]["validator"] == "schema"
+
 
 class TestSchemaValidatorErrorFeedback:
     """Test error feedback generation."""
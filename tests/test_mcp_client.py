@@ -23,6 +23,18 @@ Usage:
     python tests/test_mcp_client.py --env=local --test=extract
     python tests/test_mcp_client.py --env=local --test=extract_em
 
+    # Run several tests in one session
+    python tests/test_mcp_client.py --env=local --test=classify,tag
+
+    # Bypass the on-disk response cache
+    python tests/test_mcp_client.py --env=local --test=all --no-cache
+
+    # Save machine-readable results for CI
+    python tests/test_mcp_client.py --env=local --test=all --output-jsonl=results.jsonl
+
+    # Compare environments in parallel
+    python tests/test_mcp_client.py --env=local,prod --test=all
+
     # Run with custom URL
     python tests/test_mcp_client.py --env=remote --url=https://your-server.com/sse --test=all
 
@@ -30,310 +42,595 @@ Environment Variables Required:
 - OPENAI_API_KEY (for LLM tools)
 - OPENAI_BASE_URL (optional, for OpenRouter or custom endpoints)
 - LLM_MODEL (optional, default: gpt-4o-mini)
+- MCP_MAX_INFLIGHT (optional, default: 4 concurrent tool calls per session)
+- MCP_TEST_CACHE_DIR (optional, default: ~/.cache/field_template_mcp)
+- MCP_TEST_CACHE_TTL_HOURS (optional, default: 24)
 """
 
 import asyncio
+import functools
+import hashlib
+import importlib.util
+import io
 import json
 import os
 import argparse
-
+import sys
+import threading
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import timedelta
+from pathlib import Path
+from typing import Final
+
+import httpx
 from dotenv import load_dotenv
 from mcp import ClientSession
 from mcp.client import streamable_http
+from mcp.types import CallToolResult, TextContent
 
-# Load environment variables
-load_dotenv()
+# orjson parses cache entries faster when it is installed
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
 
+# Run on uvloop's faster event loop when it is installed (not available on Windows)
+_new_event_loop = asyncio.new_event_loop
+if sys.platform != "win32":
+    try:
+        import uvloop
+    except ImportError:
+        pass
+    else:
+        _new_event_loop = uvloop.new_event_loop
 
-async def test_list_tools(url):
-    """Test listing available MCP tools"""
-    print("🚀 Testing MCP Tool Discovery")
-    print("=" * 60)
+# Load environment variables from .env unless they were already injected (e.g. in CI)
+if not os.environ.get("OPENAI_API_KEY"):
+    load_dotenv()
+
+
+# Banner rule and the separator printed between test sections
+_BAR60: Final = "=" * 60
+_SECTION_SEPARATOR: Final = f"\n{_BAR60}\n\n"
+
+# Static tool inputs shared by the tests
+NEWS_INPUT: Final = "Apple releases new iPhone with AI features"
+NEWS_CATEGORIES: Final = "tech,sports,politics"
+WEATHER_INPUT: Final = "It's a sunny day"
+WEATHER_CATEGORIES: Final = "good_weather,bad_weather"
+WEATHER_PROMPT: Final = "Classify weather descriptions"
+PROJECT_INPUT: Final = "Python REST API with FastAPI"
+PROJECT_TAGS: Final = "python,javascript,typescript,backend,frontend,fullstack"
+ML_PROJECT_INPUT: Final = "Machine learning project with Python, TensorFlow, Docker, and REST API"
+ML_PROJECT_TAGS: Final = "python,machine-learning,docker,api,tensorflow"
+ARTICLE_INPUT: Final = "Article by John Smith published on 2025-01-15 about AI"
+BLOG_INPUT: Final = "Blog post by Jane Doe from 2025-02-20 covering machine learning"
+
+
+@functools.cache
+def _load_tesla_article():
+    """Read the Tesla sample article once per process"""
+    return (Path(__file__).parent / "test-tesla-article.txt").read_text()
+
+
+def _result_text(result):
+    """Return the text of a tool result's first content block, or None if it has none"""
+    return result.content[0].text if result.content else None
+
+
+# list_tools tasks per session, so the tool inventory is fetched at most once
+_tools_cache = {}
+# Completed list_tools results per server URL, reused by later sessions in this process
+_tools_by_url = {}
+
+
+def prefetch_tools(session):
+    """Start fetching the session's tool inventory in the background, if not already started"""
+    key = id(session)
+    if key not in _tools_cache:
+        _tools_cache[key] = asyncio.ensure_future(session.list_tools())
+    return _tools_cache[key]
+
+
+async def cached_list_tools(session):
+    """Return session.list_tools(), memoized per session and per server URL"""
+    url = _cache_scope.get()
+    if url not in _tools_by_url:
+        _tools_by_url[url] = await prefetch_tools(session)
+    return _tools_by_url[url]
+
+
+# Upper bound on concurrent call_tool requests per session
+MAX_INFLIGHT = int(os.getenv("MCP_MAX_INFLIGHT", "4"))
+_inflight_limits = {}
 
-    async with streamable_http.streamablehttp_client(url) as (read, write, _):
-        async with ClientSession(read, write) as session:
-            await session.initialize()
 
-            print("\n🛠️  Listing available MCP tools")
-            tools = await session.list_tools()
-            print(f"✅ Found {len(tools.tools)} available tools:\n")
-            for i, tool in enumerate(tools.tools, 1):
-                print(f"   {i}. {tool.name}")
-                print(f"      Input Schema: {tool.inputSchema}")
-                print(f"      Description: {tool.description[:150]}...")
-                print(f"      Output Schema: {tool.outputSchema}")
-                print()
+async def guarded_call_tool(session, name, args):
+    """Call a tool with at most MAX_INFLIGHT calls in flight on the session"""
+    key = id(session)
+    if key not in _inflight_limits:
+        _inflight_limits[key] = asyncio.Semaphore(MAX_INFLIGHT)
+    async with _inflight_limits[key]:
+        return await session.call_tool(name, args)
+
+
+# On-disk cache of successful tool responses, so repeat runs skip the LLM calls
+CACHE_DIR = Path(os.getenv("MCP_TEST_CACHE_DIR", Path.home() / ".cache" / "field_template_mcp"))
+CACHE_TTL_SECONDS = float(os.getenv("MCP_TEST_CACHE_TTL_HOURS", "24")) * 60 * 60
+CACHE_ENABLED = True
+# Server URL of the running test, so responses from different environments never mix
+_cache_scope = ContextVar("cache_scope", default="")
+
+
+# Per-session tasks for calls made during this run, keyed like the disk cache,
+# so identical (tool, args) calls share one request
+_call_memo = {}
+
+
+def _encode_args(args):
+    """Canonical JSON for tool args, used in cache keys"""
+    return json.dumps(args, sort_keys=True)
+
+
+async def cached_call_tool(session, name, args, args_json=None):
+    """Call a tool, sharing identical calls within a session and reusing disk-cached responses
+
+    args_json may carry a precomputed _encode_args(args) to skip re-encoding.
+    """
+    if args_json is None:
+        args_json = _encode_args(args)
+    key = hashlib.sha256((_cache_scope.get() + name + args_json).encode()).hexdigest()
+    memo = _call_memo.setdefault(id(session), {})
+    if key not in memo:
+        memo[key] = asyncio.ensure_future(_call_tool_with_disk_cache(session, key, name, args))
+    return await memo[key]
 
-            print("✅ Tool discovery test completed!\n")  
 
+async def _call_tool_with_disk_cache(session, key, name, args):
+    """Call a tool, reusing a cached response from a run within the last CACHE_TTL_SECONDS"""
+    if not CACHE_ENABLED:
+        return await guarded_call_tool(session, name, args)
 
-async def test_classify(url):
+    path = CACHE_DIR / f"{key}.json"
+    try:
+        if time.time() - path.stat().st_mtime < CACHE_TTL_SECONDS:
+            text = _json_loads(path.read_bytes())["text"]
+            return CallToolResult(content=[TextContent(type="text", text=text)], isError=False)
+    except (OSError, ValueError, KeyError):
+        pass
+
+    result = await guarded_call_tool(session, name, args)
+    text = _result_text(result)
+    if not result.isError and text is not None:
+        # Write to a temp file and rename so readers never see a partial entry
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps({"name": name, "text": text}))
+        os.replace(tmp_path, path)
+    return result
+
+
+# Run test_all's tests one after another instead of concurrently (set by --sequential)
+SEQUENTIAL = False
+
+# Make a throwaway tool call before running tests (set by --warmup)
+WARMUP = False
+
+# Open JSONL file receiving one record per tool result (set by --output-jsonl)
+JSONL_OUTPUT = None
+_jsonl_lock = threading.Lock()
+
+
+# Results longer than this are formatted in a worker thread, off the event loop
+LARGE_RESULT_CHARS = 4096
+
+
+def _render_result(tool, case, result, note=""):
+    """Format a tool result as a log line, plus a JSONL record line when JSONL_OUTPUT is set"""
+    text = _result_text(result)
+    if result.isError:
+        line = f"❌ Error: {text or 'Unknown error'}"
+    else:
+        line = f"✅ Result: {text}{note}"
+
+    record_line = None
+    if JSONL_OUTPUT is not None:
+        record = {"url": _cache_scope.get(), "tool": tool, "case": case}
+        record["error" if result.isError else "result"] = text
+        record_line = json.dumps(record, ensure_ascii=False) + "\n"
+    return line, record_line
+
+
+async def report_result(log, tool, case, result, note=""):
+    """Log a tool result, and append it as a JSONL record when JSONL_OUTPUT is set
+
+    Args:
+        log: print-like function for human-readable output
+        tool: Tool name
+        case: Case number within the test
+        result: CallToolResult to report
+        note: Text appended to a successful result line
+    """
+    text = _result_text(result)
+    if text is not None and len(text) > LARGE_RESULT_CHARS:
+        # Keep sibling calls on the loop moving while a large payload is formatted
+        line, record_line = await asyncio.to_thread(_render_result, tool, case, result, note)
+    else:
+        line, record_line = _render_result(tool, case, result, note)
+
+    log(line)
+    if record_line is not None:
+        with _jsonl_lock:
+            JSONL_OUTPUT.write(record_line)
+
+
+async def test_list_tools(session, log=print):
+    """Test listing available MCP tools"""
+    log(f"🚀 Testing MCP Tool Discovery\n{_BAR60}")
+
+    log("\n🛠️  Listing available MCP tools")
+    tools = await cached_list_tools(session)
+    log(f"✅ Found {len(tools.tools)} available tools:\n")
+    for i, tool in enumerate(tools.tools, 1):
+        log(f"   {i}. {tool.name}")
+        log(f"      Input Schema: {tool.inputSchema}")
+        log(f"      Description: {tool.description[:150]}...")
+        log(f"      Output Schema: {tool.outputSchema}")
+        log()
+
+    log("✅ Tool discovery test completed!\n")  
+
+
+@dataclass(frozen=True, slots=True)
+class Case:
+    """A single tool call made by a client test"""
+
+    label: str  # Heading printed above the result
+    tool: str
+    args: dict
+    note: str = ""  # Appended to a successful result line
+    args_json: str = field(init=False, repr=False)  # Encoded once for cache keys
+
+    def __post_init__(self):
+        object.__setattr__(self, "args_json", _encode_args(self.args))
+
+
+async def run_cases(session, cases, log=print):
+    """Call every case's tool concurrently, then report the results in case order"""
+    results = await asyncio.gather(*(
+        cached_call_tool(session, case.tool, case.args, case.args_json) for case in cases
+    ))
+    for number, (case, result) in enumerate(zip(cases, results), 1):
+        log(f"\n{case.label}")
+        await report_result(log, case.tool, number, result, note=case.note)
+
+
+CLASSIFY_CASES: Final = (
+    Case(
+        "📰 Test 1: Classifying news article",
+        "classify",
+        {"input": NEWS_INPUT, "categories": NEWS_CATEGORIES},
+    ),
+    Case(
+        "📝 Test 2: Classifying with custom prompt",
+        "classify",
+        {"input": WEATHER_INPUT, "categories": WEATHER_CATEGORIES, "prompt": WEATHER_PROMPT},
+    ),
+)
+
+TAG_CASES: Final = (
+    Case(
+        "💻 Test 1: Tagging programming project",
+        "tag",
+        {"input": PROJECT_INPUT, "tags": PROJECT_TAGS},
+    ),
+    Case(
+        "🏷️  Test 2: Tagging with max_tags=2",
+        "tag",
+        {"input": ML_PROJECT_INPUT, "tags": ML_PROJECT_TAGS, "args": {"max_tags": 2}},
+        note=" (max 2 tags)",
+    ),
+)
+
+EXTRACT_CASES: Final = (
+    Case(
+        "📄 Test 1: Extracting item_to_extract from text",
+        "extract",
+        {"input": ARTICLE_INPUT, "item_to_extract": "date"},
+    ),
+    Case(
+        "🔍 Test 2: Extracting from blog post",
+        "extract",
+        {"input": BLOG_INPUT, "item_to_extract": "author"},
+    ),
+)
+
+
+@functools.cache
+def _extract_metric_cases():
+    """Build the extract_metric_by_entity cases (the article is read on first use)"""
+    tesla_article = _load_tesla_article()
+
+    def case(label, item_to_extract, **extra):
+        args = {"input": tesla_article, "entity_to_extract": "Tesla", "item_to_extract": item_to_extract}
+        return Case(label, "extract_metric_by_entity", {**args, **extra})
+
+    return (
+        case("📊 Test 1: Extract EVs sold for Tesla", "EVs sold globally"),
+        case("🔋 Test 2: Extract renewable energy usage for Tesla", "renewable energy usage"),
+        case(
+            "♻️  Test 3: Extract battery recycling growth for Tesla in 2024",
+            "battery recycling throughput growth",
+            date="2024",
+        ),
+        case("💧 Test 4: Extract water usage per vehicle for Tesla", "water use per vehicle"),
+        case("🌍 Test 5: Extract CO2 emissions avoided by Tesla customers", "CO2 emissions avoided"),
+    )
+
+
+async def test_classify(session, log=print):
     """Test the classify tool"""
-    print("🚀 Testing classify Tool")
-    print("=" * 60)
+    log(f"🚀 Testing classify Tool\n{_BAR60}")
+
+    await run_cases(session, CLASSIFY_CASES, log)
+
+    log("\n✅ classify tool test completed!")
 
-    async with streamable_http.streamablehttp_client(url) as (read, write, _):
-        async with ClientSession(read, write) as session:
-            await session.initialize()
 
-            # Test 1: Classify news article
-            print("\n📰 Test 1: Classifying news article")
-            classify_res = await session.call_tool(
-                "classify",
-                {
-                    "input": "Apple releases new iPhone with AI features",
-                    "categories": "tech,sports,politics"
-                }
-            )
-
-            if classify_res.isError:
-                print(f"❌ Error: {classify_res.content[0].text if classify_res.content else 'Unknown error'}")
-            else:
-                result_text = classify_res.content[0].text if classify_res.content else None
-                print(f"✅ Result: {result_text}")
-
-            # Test 2: Classify with custom prompt
-            print("\n📝 Test 2: Classifying with custom prompt")
-            classify_res2 = await session.call_tool(
-                "classify",
-                {
-                    "input": "It's a sunny day",
-                    "categories": "good_weather,bad_weather",
-                    "prompt": "Classify weather descriptions"
-                }
-            )
-
-            if classify_res2.isError:
-                print(f"❌ Error: {classify_res2.content[0].text if classify_res2.content else 'Unknown error'}")
-            else:
-                result_text = classify_res2.content[0].text if classify_res2.content else None
-                print(f"✅ Result: {result_text}")
-
-            print("\n✅ classify tool test completed!")
-
-
-async def test_tag(url):
+async def test_tag(session, log=print):
     """Test the tag tool"""
-    print("🚀 Testing tag Tool")
-    print("=" * 60)
+    log(f"🚀 Testing tag Tool\n{_BAR60}")
 
-    async with streamable_http.streamablehttp_client(url) as (read, write, _):
-        async with ClientSession(read, write) as session:
-            await session.initialize()
+    await run_cases(session, TAG_CASES, log)
+
+    log("\n✅ tag tool test completed!")
 
-            # Test 1: Tag programming project
-            print("\n💻 Test 1: Tagging programming project")
-            tag_res = await session.call_tool(
-                "tag",
-                {
-                    "input": "Python REST API with FastAPI",
-                    "tags": "python,javascript,typescript,backend,frontend,fullstack"
-                }
-            )
-
-            if tag_res.isError:
-                print(f"❌ Error: {tag_res.content[0].text if tag_res.content else 'Unknown error'}")
-            else:
-                result_text = tag_res.content[0].text if tag_res.content else None
-                print(f"✅ Result: {result_text}")
-
-            # Test 2: Tag with max_tags limit
-            print("\n🏷️  Test 2: Tagging with max_tags=2")
-            tag_res2 = await session.call_tool(
-                "tag",
-                {
-                    "input": "Machine learning project with Python, TensorFlow, Docker, and REST API",
-                    "tags": "python,machine-learning,docker,api,tensorflow",
-                    "args": {"max_tags": 2}
-                }
-            )
-
-            if tag_res2.isError:
-                print(f"❌ Error: {tag_res2.content[0].text if tag_res2.content else 'Unknown error'}")
-            else:
-                result_text = tag_res2.content[0].text if tag_res2.content else None
-                print(f"✅ Result: {result_text} (max 2 tags)")
-
-            print("\n✅ tag tool test completed!")
-
-
-async def test_extract(url):
+
+async def test_extract(session, log=print):
     """Test the extract tool"""
-    print("🚀 Testing extract Tool")
-    print("=" * 60)
+    log(f"🚀 Testing extract Tool\n{_BAR60}")
 
-    async with streamable_http.streamablehttp_client(url) as (read, write, _):
-        async with ClientSession(read, write) as session:
-            await session.initialize()
+    await run_cases(session, EXTRACT_CASES, log)
+
+    log("\n✅ extract tool test completed!")
 
-            # Test 1: Extract item_to_extract from text
-            print("\n📄 Test 1: Extracting item_to_extract from text")
-            extract_res = await session.call_tool(
-                "extract",
-                {
-                    "input": "Article by John Smith published on 2025-01-15 about AI",
-                    # "item_to_extract": "author,date,topic"
-                     "item_to_extract": "date"
-                }
-            )
-
-            if extract_res.isError:
-                print(f"❌ Error: {extract_res.content[0].text if extract_res.content else 'Unknown error'}")
-            else:
-                result_text = extract_res.content[0].text if extract_res.content else None
-                print(f"✅ Result: {result_text}")
-
-            # Test 2: Extract another example
-            print("\n🔍 Test 2: Extracting from blog post")
-            extract_res2 = await session.call_tool(
-                "extract",
-                {
-                    "input": "Blog post by Jane Doe from 2025-02-20 covering machine learning",
-                    "item_to_extract": "author" # ,date,topic
-                }
-            )
-
-            if extract_res2.isError:
-                print(f"❌ Error: {extract_res2.content[0].text if extract_res2.content else 'Unknown error'}")
-            else:
-                result_text = extract_res2.content[0].text if extract_res2.content else None
-                print(f"✅ Result: {result_text}")
-
-            print("\n✅ extract tool test completed!")
-
-
-async def test_extract_metric_by_entity(url):
+
+async def test_extract_metric_by_entity(session, log=print):
     """Test the extract_metric_by_entity tool"""
-    print("🚀 Testing extract_metric_by_entity Tool")
-    print("=" * 60)
+    log(f"🚀 Testing extract_metric_by_entity Tool\n{_BAR60}")
+
+    await run_cases(session, _extract_metric_cases(), log)
 
-    # Read the Tesla article
-    test_article_path = os.path.join(os.path.dirname(__file__), "test-tesla-article.txt")
-    with open(test_article_path, 'r') as f:
-        tesla_article = f.read()
+    log("\n✅ extract_metric_by_entity tool test completed!")
 
-    async with streamable_http.streamablehttp_client(url) as (read, write, _):
+
+# Keep a warm connection pool per session; HTTP/2 multiplexes the calls when h2 is installed
+_HTTP_LIMITS: Final = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+_HTTP2: Final = importlib.util.find_spec("h2") is not None
+
+
+def _http_client_factory(headers=None, timeout=None, auth=None):
+    """Build the transport's httpx client with explicit connection limits"""
+    return httpx.AsyncClient(
+        headers=headers,
+        timeout=timeout or httpx.Timeout(30, read=300),
+        auth=auth,
+        limits=_HTTP_LIMITS,
+        http2=_HTTP2,
+        follow_redirects=True,
+    )
+
+
+@asynccontextmanager
+async def mcp_session(url, *, timeout=30):
+    """Open a streamable HTTP connection to url and yield an initialized ClientSession
+
+    Args:
+        url: MCP server endpoint
+        timeout: HTTP timeout in seconds for each request
+    """
+    async with streamable_http.streamablehttp_client(
+        url,
+        timeout=timedelta(seconds=timeout),
+        httpx_client_factory=_http_client_factory,
+    ) as (read, write, _):
         async with ClientSession(read, write) as session:
             await session.initialize()
+            # Overlap tool discovery with the first tool calls, unless already known
+            tools_task = None if url in _tools_by_url else prefetch_tools(session)
+            try:
+                yield session
+            finally:
+                _tools_cache.pop(id(session), None)
+                _inflight_limits.pop(id(session), None)
+                _call_memo.pop(id(session), None)
+                if tools_task is not None:
+                    tools_task.cancel()
+                    await asyncio.gather(tools_task, return_exceptions=True)
+
+
+@asynccontextmanager
+async def buffered_stdout(max_batch=64, interval=0.01):
+    """Yield a print-like log function whose output is written to stdout in batches
+
+    Lines are queued and a single writer task flushes them every interval seconds
+    (or every max_batch lines), so chatty tests make far fewer write syscalls.
+    """
+    queue = asyncio.Queue()
+
+    async def writer():
+        done = False
+        while not done:
+            batch = [await queue.get()]
+            await asyncio.sleep(interval)
+            while not queue.empty() and len(batch) < max_batch:
+                batch.append(queue.get_nowait())
+            if batch[-1] is None:
+                done = True
+                batch.pop()
+            sys.stdout.write("".join(batch))
+            sys.stdout.flush()
+
+    def log(*args, sep=" ", end="\n"):
+        queue.put_nowait(sep.join(map(str, args)) + end)
+
+    task = asyncio.create_task(writer())
+    try:
+        yield log
+    finally:
+        # None tells the writer to flush what is left and stop
+        queue.put_nowait(None)
+        await task
+
+
+async def warmup(session):
+    """Make one small uncached tool call so server and LLM cold-start costs land before the tests"""
+    await guarded_call_tool(session, "classify", {"input": "warm up", "categories": "a,b"})
+
+
+async def run_test(url, test, log=None):
+    """Open one MCP session on url and run test against it
+
+    Output goes to log if given, otherwise to stdout through buffered_stdout.
+    """
+    _cache_scope.set(url)
+    async with mcp_session(url) as session:
+        if WARMUP:
+            await warmup(session)
+        if log is not None:
+            await test(session, log=log)
+        else:
+            async with buffered_stdout() as log:
+                await test(session, log=log)
+
+
+class _AsyncLoopThread:
+    """An event loop running forever in a daemon thread"""
+
+    def __init__(self):
+        self.loop = _new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def submit(self, coro):
+        """Schedule coro on this thread's loop and return a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+def run_on_envs(urls, test):
+    """Run test against several servers at once, one event loop thread per server
+
+    Each environment's output is buffered and printed as a block once it finishes.
+
+    Args:
+        urls: Mapping of environment name to server URL
+        test: Test coroutine function taking (session, log)
+    """
+    print_lock = threading.Lock()
+
+    async def run_env(env, url):
+        buf = io.StringIO()
+        try:
+            await run_test(url, test, log=functools.partial(print, file=buf))
+        finally:
+            with print_lock:
+                print(f"🔗 {env} environment: {url}\n{_BAR60}\n{buf.getvalue()}")
+
+    threads = [_AsyncLoopThread() for _ in urls]
+    try:
+        futures = [
+            thread.submit(run_env(env, url))
+            for thread, (env, url) in zip(threads, urls.items())
+        ]
+        for future in futures:
+            future.result()
+    finally:
+        for thread in threads:
+            thread.stop()
+
+
+async def run_tests(session, tests, log=print):
+    """Run several tests on a shared session, printing each test's output in order
+
+    Tests run concurrently unless SEQUENTIAL is set (--sequential). A failing test
+    is reported in its own section without stopping the others.
+    """
+    # Each test writes into its own buffer so concurrent output doesn't interleave
+    buffers = [io.StringIO() for _ in tests]
+
+    async def run_one(test, buf):
+        test_log = functools.partial(print, file=buf)
+        # Catch here so one failure doesn't cancel the rest of the task group
+        try:
+            await test(session, log=test_log)
+        except Exception as e:
+            test_log(f"❌ {test.__name__} failed: {e!r}")
+
+    if SEQUENTIAL:
+        for test, buf in zip(tests, buffers):
+            await run_one(test, buf)
+    else:
+        async with asyncio.TaskGroup() as tg:
+            for test, buf in zip(tests, buffers):
+                tg.create_task(run_one(test, buf))
+
+    log(_SECTION_SEPARATOR.join(buf.getvalue() for buf in buffers), end="")
+
+
+async def test_all(session, log=print):
+    """Run all tests on a shared session"""
+    log(f"🧪 Running ALL Tests\n{_BAR60}")
+
+    await run_tests(
+        session,
+        [
+            test_list_tools,
+            test_classify,
+            test_tag,
+            test_extract,
+            test_extract_metric_by_entity,
+        ],
+        log,
+    )
+
+    log("\n✅ All tests completed!")
 
-            # Test 1: Extract EVs sold for Tesla
-            print("\n📊 Test 1: Extract EVs sold for Tesla")
-            result1 = await session.call_tool(
-                "extract_metric_by_entity",
-                {
-                    "input": tesla_article,
-                    "entity_to_extract": "Tesla",
-                    "item_to_extract": "EVs sold globally"
-                }
-            )
-
-            if result1.isError:
-                print(f"❌ Error: {result1.content[0].text if result1.content else 'Unknown error'}")
-            else:
-                result_text = result1.content[0].text if result1.content else None
-                print(f"✅ Result: {result_text}")
-
-            # Test 2: Extract renewable energy usage
-            print("\n🔋 Test 2: Extract renewable energy usage for Tesla")
-            result2 = await session.call_tool(
-                "extract_metric_by_entity",
-                {
-                    "input": tesla_article,
-                    "entity_to_extract": "Tesla",
-                    "item_to_extract": "renewable energy usage"
-                }
-            )
-
-            if result2.isError:
-                print(f"❌ Error: {result2.content[0].text if result2.content else 'Unknown error'}")
-            else:
-                result_text = result2.content[0].text if result2.content else None
-                print(f"✅ Result: {result_text}")
-
-            # Test 3: Extract battery recycling growth with date
-            print("\n♻️  Test 3: Extract battery recycling growth for Tesla in 2024")
-            result3 = await session.call_tool(
-                "extract_metric_by_entity",
-                {
-                    "input": tesla_article,
-                    "entity_to_extract": "Tesla",
-                    "item_to_extract": "battery recycling throughput growth",
-                    "date": "2024"
-                }
-            )
-
-            if result3.isError:
-                print(f"❌ Error: {result3.content[0].text if result3.content else 'Unknown error'}")
-            else:
-                result_text = result3.content[0].text if result3.content else None
-                print(f"✅ Result: {result_text}")
-
-            # Test 4: Extract water usage per vehicle
-            print("\n💧 Test 4: Extract water usage per vehicle for Tesla")
-            result4 = await session.call_tool(
-                "extract_metric_by_entity",
-                {
-                    "input": tesla_article,
-                    "entity_to_extract": "Tesla",
-                    "item_to_extract": "water use per vehicle"
-                }
-            )
-
-            if result4.isError:
-                print(f"❌ Error: {result4.content[0].text if result4.content else 'Unknown error'}")
-            else:
-                result_text = result4.content[0].text if result4.content else None
-                print(f"✅ Result: {result_text}")
-
-            # Test 5: Extract CO2 emissions avoided
-            print("\n🌍 Test 5: Extract CO2 emissions avoided by Tesla customers")
-            result5 = await session.call_tool(
-                "extract_metric_by_entity",
-                {
-                    "input": tesla_article,
-                    "entity_to_extract": "Tesla",
-                    "item_to_extract": "CO2 emissions avoided"
-                }
-            )
-
-            if result5.isError:
-                print(f"❌ Error: {result5.content[0].text if result5.content else 'Unknown error'}")
-            else:
-                result_text = result5.content[0].text if result5.content else None
-                print(f"✅ Result: {result_text}")
-
-            print("\n✅ extract_metric_by_entity tool test completed!")
-
-
-async def test_all(url):
-    """Run all tests"""
-    print("🧪 Running ALL Tests")
-    print("=" * 60)
-
-    await test_list_tools(url)
-    print("\n" + "=" * 60 + "\n")
-
-    await test_classify(url)
-    print("\n" + "=" * 60 + "\n")
-
-    await test_tag(url)
-    print("\n" + "=" * 60 + "\n")
-
-    await test_extract(url)
-    print("\n" + "=" * 60 + "\n")
-
-    await test_extract_metric_by_entity(url)
-
-    print("\n✅ All tests completed!")
+
+# CLI test name -> test coroutine function
+TESTS = {
+    "all": test_all,
+    "list_tools": test_list_tools,
+    "classify": test_classify,
+    "tag": test_tag,
+    "extract": test_extract,
+    "extract_em": test_extract_metric_by_entity,
+}
+
+# CLI environment name -> server URL (--env=remote takes its URL from --url)
+ENV_URLS = {
+    # FastMCP streamable-http uses /mcp endpoint
+    "local": "http://127.0.0.1:8322/mcp",
+    "prod": "https://be-dev.omnimcp.ai/api/v1/mcp/a6ebdc49-50e7-4c54-8d2a-639f10098a63/68f1a606ca402315fcf9cc90/sse",
+}
 
 
 def main():
     parser = argparse.ArgumentParser(description="Test Field Template MCP Server")
     parser.add_argument(
         "--env",
-        choices=["local", "prod", "remote"],
         default="local",
-        help="Environment to use: local (127.0.0.1:8322), prod (omnimcp.ai), or remote (custom URL)",
+        help=(
+            "Environment(s) to use, comma-separated to run several in parallel: "
+            "local (127.0.0.1:8322), prod (omnimcp.ai), or remote (custom URL)"
+        ),
     )
     parser.add_argument(
         "--url",
@@ -343,41 +640,83 @@ def main():
     )
     parser.add_argument(
         "--test",
-        choices=["all", "list_tools", "classify", "tag", "extract", "extract_em"],
         default="all",
-        help="Which test to run",
+        help=(
+            "Which test(s) to run, comma-separated to run several on one session: "
+            + ", ".join(TESTS)
+        ),
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"Always call the server instead of reusing responses cached in {CACHE_DIR}",
+    )
+    parser.add_argument(
+        "--sequential",
+        action="store_true",
+        help="Run the tests in --test=all one at a time (useful for debugging)",
+    )
+    parser.add_argument(
+        "--warmup",
+        action="store_true",
+        help="Make one throwaway tool call before the tests so cold-start cost isn't attributed to them",
+    )
+    parser.add_argument(
+        "--output-jsonl",
+        type=str,
+        default="",
+        help="Also write each tool result as a JSON line to this file",
     )
     
     args = parser.parse_args()
-    
-    # Determine URL
-    if args.env == "local":
-        # FastMCP streamable-http uses /mcp endpoint
-        url = "http://127.0.0.1:8322/mcp"
-    elif args.env == "prod":
-        url = "https://be-dev.omnimcp.ai/api/v1/mcp/a6ebdc49-50e7-4c54-8d2a-639f10098a63/68f1a606ca402315fcf9cc90/sse"
-    elif args.env == "remote":
-        if not args.url:
-            print("❌ Error: --url required for remote environment")
+
+    # Resolve tests
+    names = [name.strip() for name in args.test.split(",")]
+    unknown = [name for name in names if name not in TESTS]
+    if unknown:
+        print(f"❌ Error: unknown test(s) {', '.join(unknown)} (choose from {', '.join(TESTS)})")
+        return
+
+    # Determine URLs
+    urls = {}
+    for env in args.env.split(","):
+        env = env.strip()
+        if env == "remote":
+            if not args.url:
+                print("❌ Error: --url required for remote environment")
+                return
+            urls[env] = args.url
+        elif env in ENV_URLS:
+            urls[env] = ENV_URLS[env]
+        else:
+            print(f"❌ Error: unknown environment '{env}' (choose from {', '.join(ENV_URLS)}, remote)")
             return
-        url = args.url
-    
-    print(f"🔗 Using {args.env} environment: {url}")
+
+    global CACHE_ENABLED, JSONL_OUTPUT, SEQUENTIAL, WARMUP
+    CACHE_ENABLED = not args.no_cache
+    SEQUENTIAL = args.sequential
+    WARMUP = args.warmup
+
+    for env, url in urls.items():
+        print(f"🔗 Using {env} environment: {url}")
     print(f"🧪 Running test: {args.test}\n")
     
-    # Run selected test
-    if args.test == "all":
-        asyncio.run(test_all(url))
-    elif args.test == "list_tools":
-        asyncio.run(test_list_tools(url))
-    elif args.test == "classify":
-        asyncio.run(test_classify(url))
-    elif args.test == "tag":
-        asyncio.run(test_tag(url))
-    elif args.test == "extract":
-        asyncio.run(test_extract(url))
-    elif args.test == "extract_em":
-        asyncio.run(test_extract_metric_by_entity(url))
+    if len(names) == 1:
+        test = TESTS[names[0]]
+    else:
+        test = functools.partial(run_tests, tests=[TESTS[name] for name in names])
+
+    if args.output_jsonl:
+        JSONL_OUTPUT = open(args.output_jsonl, "w", encoding="utf-8")
+    try:
+        if len(urls) == 1:
+            with asyncio.Runner(loop_factory=_new_event_loop) as runner:
+                runner.run(run_test(next(iter(urls.values())), test))
+        else:
+            run_on_envs(urls, test)
+    finally:
+        if JSONL_OUTPUT is not None:
+            JSONL_OUTPUT.close()
 
 
 if __name__ == "__main__":
@@ -9,8 +9,16 @@ Simplified single input/output format:
 
 import pytest
 
+# One xdist worker per tool under --dist loadgroup, so each reuses its warm client and caches
+pytestmark = [pytest.mark.llm, pytest.mark.xdist_group("classify_by_llm")]
 
-@pytest.fixture
+# Allowed categories per test, as sets for membership checks
+NEWS_CATEGORIES = frozenset({"entertainment", "economy", "policy", "sports"})
+TOPIC_CATEGORIES = frozenset({"tech", "sports", "politics"})
+MIXED_CATEGORIES = frozenset({"tech", "business", "food", "space"})
+
+
+@pytest.fixture(scope="session")
 def classify_by_llm():
     """
     Fixture that provides the classify_by_llm function.
@@ -32,9 +40,9 @@ class TestClassifyByLLMBasic:
 
         # Verify result is a string
         assert isinstance(result, str)
-        assert result in ["entertainment", "economy", "policy", "sports"]
+        assert result in NEWS_CATEGORIES
         # Semantic check
-        assert result in ["economy", "policy"]
+        assert result in {"economy", "policy"}
 
     @pytest.mark.asyncio
     async def test_simple_classification(self, classify_by_llm):
@@ -45,7 +53,7 @@ class TestClassifyByLLMBasic:
         )
 
         assert isinstance(result, str)
-        assert result in ["tech", "sports", "politics"]
+        assert result in TOPIC_CATEGORIES
         assert result == "tech"
 
     @pytest.mark.asyncio
@@ -106,7 +114,7 @@ class TestClassifyByLLMErrorHandling:
         )
 
         assert isinstance(result, str)
-        assert result in ["tech", "business", "food", "space"]
+        assert result in MIXED_CATEGORIES
 
 
 if __name__ == "__main__":
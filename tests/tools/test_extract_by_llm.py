@@ -9,8 +9,11 @@ Simplified single input/output format:
 
 import pytest
 
+# One xdist worker per tool under --dist loadgroup, so each reuses its warm client and caches
+pytestmark = [pytest.mark.llm, pytest.mark.xdist_group("extract_by_llm")]
 
-@pytest.fixture
+
+@pytest.fixture(scope="session")
 def extract_by_llm():
     """
     Fixture that provides the extract_by_llm function.
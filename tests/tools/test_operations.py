@@ -0,0 +1,945 @@
+"""
+Test cases for operation strategies.
+
+Uses a fake LLM client, so no API key or network access is needed.
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from openai import APIConnectionError, AuthenticationError
+from src.tools.operations import ExtractionOperation, MultiLabelOperation, OperationStrategy, SingleChoiceOperation
+from src.tools.llm_tool_executor import LLMToolExecutor
+from src.tools.template_loader import TemplateLoader
+
+
+class FakeLLMClient:
+    """Records chat calls and answers via a callback, tracking peak concurrency."""
+
+    def __init__(self, answer, delay: float = 0.01):
+        self.answer = answer
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def chat(self, messages, model=None, temperature=None, **kwargs):
+        self.calls.append(messages)
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            return self.answer(messages)
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture(scope="module")
+def templates():
+    """Templates loaded from configs/tools."""
+    return TemplateLoader()
+
+
+@pytest.fixture(autouse=True)
+def empty_response_cache():
+    """Start every test with an empty response cache."""
+    OperationStrategy.clear_response_cache()
+    yield
+    OperationStrategy.clear_response_cache()
+
+
+def _echo_last_word(messages):
+    """Answer with the last word of the text being classified."""
+    text = messages[-1]["content"].split("Text to classify:\n", 1)[1]
+    return text.split("\n", 1)[0].split()[-1]
+
+
+# Where the item text sits in each tool's user prompt, as (text marker, end marker).
+# The classify markers cover both the single prompt ("Text to classify:" ...
+# "Category:") and the batch prompt ("Texts to classify:" ... "Categories (JSON array):").
+CLASSIFY_PROMPT = ("to classify:\n", "\n\nCategor")
+EXTRACT_PROMPT = (":\n", "\n\nExtracted value")
+TAG_PROMPT = ("to tag:\n", "\n\nRelevant tags")
+
+
+def _numbered_answer(prompt, answer_for_text):
+    """Answer single prompts via answer_for_text, and batched ones with a JSON array of its answers."""
+    start, end = prompt
+
+    def answer(messages):
+        text = messages[-1]["content"].split(start, 1)[1].rsplit(end, 1)[0]
+        if not text.startswith("[1]\n"):
+            return answer_for_text(text)
+        texts = [block.split("\n", 1)[1] for block in text.split("\n\n")]
+        return json.dumps([answer_for_text(t) for t in texts])
+
+    return answer
+
+
+def _upstream_failure():
+    """A transient API error, as the LLM client raises after its retries."""
+    return APIConnectionError(message="upstream failure", request=httpx.Request("POST", "https://api.test"))
+
+
+class TestSingleChoiceConcurrency:
+    """Test that single-choice items are classified concurrently."""
+
+    async def test_results_keep_input_order(self, templates):
+        """Test results come back in input order even when run concurrently."""
+        client = FakeLLMClient(_echo_last_word)
+        items = [{"id": i, "data": f"about {topic}"} for i, topic in enumerate(["tech", "sports", "tech", "politics"])]
+
+        results = await SingleChoiceOperation().execute(
+            client,
+            templates.get_template("classify"),
+            items,
+            categories="tech,sports,politics",
+            args={"batch_size": 1},
+        )
+
+        assert results == [
+            {"id": 0, "result": "tech"},
+            {"id": 1, "result": "sports"},
+            {"id": 2, "result": "tech"},
+            {"id": 3, "result": "politics"},
+        ]
+
+    async def test_concurrency_is_bounded(self, templates):
+        """Test args.concurrency caps the number of in-flight LLM calls."""
+        client = FakeLLMClient(lambda messages: "tech")
+        items = [{"id": i, "data": f"item {i}"} for i in range(10)]
+
+        await SingleChoiceOperation().execute(
+            client,
+            templates.get_template("classify"),
+            items,
+            categories="tech,sports",
+            args={"concurrency": 3, "batch_size": 1},
+        )
+
+        assert len(client.calls) == 10
+        assert client.peak_in_flight == 3
+
+    async def test_concurrency_one_runs_sequentially(self, templates):
+        """Test concurrency=1 processes one item at a time."""
+        client = FakeLLMClient(lambda messages: "tech")
+        items = [{"id": i, "data": f"item {i}"} for i in range(4)]
+
+        await SingleChoiceOperation().execute(
+            client,
+            templates.get_template("classify"),
+            items,
+            categories="tech,sports",
+            args={"concurrency": 1, "batch_size": 1},
+        )
+
+        assert client.peak_in_flight == 1
+
+
+class TestSingleChoiceBatching:
+    """Test that several items are classified in one LLM call."""
+
+    async def test_batch_uses_one_call(self, templates):
+        """Test a list of items is classified with a single batched call."""
+        client = FakeLLMClient(_numbered_answer(CLASSIFY_PROMPT, lambda text: "Sports" if "game" in text else "tech"))
+        items = [{"id": "a", "data": "new phone"}, {"id": "b", "data": "big game"}, {"id": "c", "data": "chip news"}]
+
+        results = await SingleChoiceOperation().execute(
+            client, templates.get_template("classify"), items, categories="tech,sports"
+        )
+
+        assert len(client.calls) == 1
+        assert results == [
+            {"id": "a", "result": "tech"},
+            {"id": "b", "result": "sports"},
+            {"id": "c", "result": "tech"},
+        ]
+
+    async def test_batches_are_chunked(self, templates):
+        """Test args.batch_size splits items across calls."""
+        client = FakeLLMClient(_numbered_answer(CLASSIFY_PROMPT, lambda text: "tech"))
+        items = [{"id": i, "data": f"item {i}"} for i in range(5)]
+
+        results = await SingleChoiceOperation().execute(
+            client, templates.get_template("classify"), items, categories="tech,sports", args={"batch_size": 2}
+        )
+
+        # Batches of 2, 2 and a single trailing item
+        assert len(client.calls) == 3
+        assert [r["id"] for r in results] == [0, 1, 2, 3, 4]
+        assert all(r["result"] == "tech" for r in results)
+
+    async def test_unparseable_batch_falls_back_per_item(self, templates):
+        """Test a batch reply that isn't a JSON array is retried item by item."""
+        client = FakeLLMClient(lambda messages: "tech")
+        items = [{"id": i, "data": f"item {i}"} for i in range(3)]
+
+        results = await SingleChoiceOperation().execute(
+            client, templates.get_template("classify"), items, categories="tech,sports"
+        )
+
+        # One failed batch call, then one call per item
+        assert len(client.calls) == 4
+        assert results == [{"id": i, "result": "tech"} for i in range(3)]
+
+    async def test_wrong_length_batch_falls_back_per_item(self, templates):
+        """Test a batch reply with the wrong number of answers is retried item by item."""
+        def answer(messages):
+            return '["tech"]' if "[1]" in messages[-1]["content"] else "sports"
+
+        client = FakeLLMClient(answer)
+        items = [{"id": i, "data": f"item {i}"} for i in range(2)]
+
+        results = await SingleChoiceOperation().execute(
+            client, templates.get_template("classify"), items, categories="tech,sports"
+        )
+
+        assert len(client.calls) == 3
+        assert results == [{"id": 0, "result": "sports"}, {"id": 1, "result": "sports"}]
+
+
+    async def test_batch_uses_batch_prompts(self, templates):
+        """Test batched calls use the batch templates instead of the single-answer ones."""
+        client = FakeLLMClient(_numbered_answer(CLASSIFY_PROMPT, lambda text: "tech"))
+        items = [{"id": 0, "data": "new phone"}, {"id": 1, "data": "chip news"}]
+
+        await SingleChoiceOperation().execute(
+            client, templates.get_template("classify"), items, categories="tech,sports", prompt="Be strict."
+        )
+
+        system, user = client.calls[0]
+        assert "JSON array" in system["content"]
+        assert "Return ONLY the category name" not in system["content"]
+        assert system["content"].endswith("Be strict.")
+        assert user["content"].endswith("Categories (JSON array):")
+
+
+class TestSingleChoiceResponseCache:
+    """Test that deterministic results are reused across calls."""
+
+    async def test_repeated_call_is_served_from_cache(self, templates):
+        """Test a second identical call makes no LLM calls."""
+        client = FakeLLMClient(_numbered_answer(CLASSIFY_PROMPT, lambda text: "tech"))
+        items = [{"id": 0, "data": "new phone"}, {"id": 1, "data": "chip news"}]
+        template = templates.get_template("classify")
+
+        first = await SingleChoiceOperation().execute(client, template, items, categories="tech,sports")
+        second = await SingleChoiceOperation().execute(
+            client, template, [{"id": "x", "data": "chip news"}], categories="tech,sports"
+        )
+
+        assert len(client.calls) == 1
+        assert first == [{"id": 0, "result": "tech"}, {"id": 1, "result": "tech"}]
+        assert second == [{"id": "x", "result": "tech"}]
+
+    async def test_only_misses_reach_the_llm(self, templates):
+        """Test cached items are left out of the next LLM call."""
+        client = FakeLLMClient(_echo_last_word)
+        template = templates.get_template("classify")
+
+        await SingleChoiceOperation().execute(
+            client, template, [{"id": 0, "data": "about tech"}], categories="tech,sports"
+        )
+        results = await SingleChoiceOperation().execute(
+            client,
+            template,
+            [{"id": 0, "data": "about tech"}, {"id": 1, "data": "about sports"}],
+            categories="tech,sports",
+        )
+
+        assert len(client.calls) == 2
+        assert "about tech" not in client.calls[-1][-1]["content"]
+        assert results == [{"id": 0, "result": "tech"}, {"id": 1, "result": "sports"}]
+
+    async def test_nonzero_temperature_bypasses_cache(self, templates):
+        """Test calls with temperature above 0 always reach the LLM."""
+        client = FakeLLMClient(lambda messages: "tech")
+        items = [{"id": 0, "data": "new phone"}]
+        template = templates.get_template("classify")
+
+        for _ in range(2):
+            await SingleChoiceOperation().execute(
+                client, template, items, categories="tech,sports", args={"temperature": 0.7}
+            )
+
+        assert len(client.calls) == 2
+
+    async def test_env_knob_disables_cache(self, templates, monkeypatch):
+        """Test LLM_RESPONSE_CACHE_DISABLE=1 turns the cache off."""
+        monkeypatch.setenv("LLM_RESPONSE_CACHE_DISABLE", "1")
+        client = FakeLLMClient(lambda messages: "tech")
+        items = [{"id": 0, "data": "new phone"}]
+        template = templates.get_template("classify")
+
+        for _ in range(2):
+            await SingleChoiceOperation().execute(client, template, items, categories="tech,sports")
+
+        assert len(client.calls) == 2
+
+
+class TestMultiLabelBatching:
+    """Test that several items are tagged in one LLM call."""
+
+    async def test_batch_uses_one_call(self, templates):
+        """Test a list of items is tagged with a single batched call, in order."""
+        client = FakeLLMClient(
+            _numbered_answer(TAG_PROMPT, lambda text: "Python, backend" if "API" in text else "frontend")
+        )
+        items = [{"id": "a", "data": "REST API"}, {"id": "b", "data": "React app"}]
+
+        results = await MultiLabelOperation().execute(
+            client, templates.get_template("tag"), items, tags="python,backend,frontend"
+        )
+
+        assert len(client.calls) == 1
+        assert results == [{"id": "a", "result": "python,backend"}, {"id": "b", "result": "frontend"}]
+
+    async def test_list_answers_are_accepted(self, templates):
+        """Test batched answers given as label lists are used like comma-separated ones."""
+        client = FakeLLMClient(
+            _numbered_answer(TAG_PROMPT, lambda text: ["python", "backend"] if "API" in text else [])
+        )
+        items = [{"id": 0, "data": "REST API"}, {"id": 1, "data": "a poem"}]
+
+        results = await MultiLabelOperation().execute(
+            client, templates.get_template("tag"), items, tags="python,backend", args={"max_tags": 1}
+        )
+
+        assert len(client.calls) == 1
+        assert results == [{"id": 0, "result": "python"}, {"id": 1, "result": ""}]
+
+    async def test_batch_uses_batch_prompts(self, templates):
+        """Test batched calls use the batch templates instead of the comma-separated ones."""
+        client = FakeLLMClient(_numbered_answer(TAG_PROMPT, lambda text: ["python"]))
+        items = [{"id": 0, "data": "REST API"}, {"id": 1, "data": "CLI tool"}]
+
+        await MultiLabelOperation().execute(
+            client, templates.get_template("tag"), items, tags="python,backend", prompt="Be strict."
+        )
+
+        system, user = client.calls[0]
+        assert "JSON array" in system["content"]
+        assert "Return ONLY the tags as a comma-separated list" not in system["content"]
+        assert system["content"].endswith("Be strict.\n\nAvailable tags: python, backend")
+        assert user["content"].endswith("Relevant tags (JSON array):")
+
+    async def test_tags_are_in_shared_system_prompt(self, templates):
+        """Test the tag list goes in the system prompt, leaving only the text in the user prompt."""
+        client = FakeLLMClient(lambda messages: "python")
+
+        await MultiLabelOperation().execute(
+            client, templates.get_template("tag"), [{"id": 0, "data": "REST API"}], tags="python,backend"
+        )
+
+        system, user = client.calls[0]
+        assert system["content"].endswith("Available tags: python, backend")
+        assert "backend" not in user["content"]
+
+    async def test_duplicate_texts_are_tagged_once(self, templates):
+        """Test duplicate texts are sent once and their tags are copied to every id."""
+        client = FakeLLMClient(lambda messages: "python")
+        items = [{"id": "a", "data": "REST API"}, {"id": "b", "data": "REST API"}]
+
+        results = await MultiLabelOperation().execute(
+            client, templates.get_template("tag"), items, tags="python,backend"
+        )
+
+        assert len(client.calls) == 1
+        assert "[1]" not in client.calls[0][-1]["content"]
+        assert results == [{"id": "a", "result": "python"}, {"id": "b", "result": "python"}]
+
+    async def test_blank_items_skip_the_llm(self, templates):
+        """Test empty texts get no tags without an LLM call."""
+        client = FakeLLMClient(lambda messages: "python")
+        items = [{"id": 0, "data": "  "}, {"id": 1, "data": "REST API"}, {"id": 2, "data": None}]
+
+        results = await MultiLabelOperation().execute(
+            client, templates.get_template("tag"), items, tags="python,backend"
+        )
+
+        assert len(client.calls) == 1
+        assert results == [{"id": 0, "result": ""}, {"id": 1, "result": "python"}, {"id": 2, "result": ""}]
+
+    async def test_items_are_batched_by_length(self, templates):
+        """Test short and long items go to separate batches and results keep input order."""
+        client = FakeLLMClient(_numbered_answer(TAG_PROMPT, lambda text: "backend" if len(text) > 100 else "python"))
+        long_text = "server " * 50
+        texts = ["py 0", long_text + "1", "py 2", long_text + "3"]
+        items = [{"id": i, "data": text} for i, text in enumerate(texts)]
+
+        results = await MultiLabelOperation().execute(
+            client, templates.get_template("tag"), items, tags="python,backend", args={"batch_size": 2}
+        )
+
+        assert len(client.calls) == 2
+        assert [r["result"] for r in results] == ["python", "backend", "python", "backend"]
+
+    async def test_unusable_batch_falls_back_per_item(self, templates):
+        """Test a batch reply that isn't a JSON array is retried item by item."""
+        client = FakeLLMClient(lambda messages: "python")
+        items = [{"id": i, "data": f"item {i}"} for i in range(3)]
+
+        results = await MultiLabelOperation().execute(
+            client, templates.get_template("tag"), items, tags="python,backend"
+        )
+
+        assert len(client.calls) == 4
+        assert results == [{"id": i, "result": "python"} for i in range(3)]
+
+
+class TestMultiLabelEarlyStop:
+    """Test that generation stops once max_tags labels are produced."""
+
+    async def test_stop_condition_counts_complete_labels(self, templates):
+        """Test the stop check passed to the client fires after max_tags complete labels."""
+        checks = []
+
+        class RecordingClient(FakeLLMClient):
+            async def chat(self, messages, stop_when=None, **kwargs):
+                checks.append(stop_when)
+                return await super().chat(messages, **kwargs)
+
+        client = RecordingClient(lambda messages: "python, backend, database")
+
+        results = await MultiLabelOperation().execute(
+            client,
+            templates.get_template("tag"),
+            [{"id": 0, "data": "REST API"}],
+            tags="python,backend,database",
+            args={"max_tags": 2},
+        )
+
+        stop_when = checks[0]
+        assert not stop_when("python, backend")
+        assert stop_when("python, backend, da")
+        assert results == [{"id": 0, "result": "python,backend"}]
+
+
+class TestMultiLabelConstrainedOutput:
+    """Test tagging with provider-enforced structured output."""
+
+    async def test_schema_allows_only_choices(self, templates):
+        """Test the response_format enum lists the choices and the reply is read from it."""
+        formats = []
+
+        class RecordingClient(FakeLLMClient):
+            async def chat(self, messages, response_format=None, **kwargs):
+                formats.append(response_format)
+                return await super().chat(messages, **kwargs)
+
+        client = RecordingClient(lambda messages: '{"labels": ["backend", "python"]}')
+
+        results = await MultiLabelOperation().execute(
+            client,
+            templates.get_template("tag"),
+            [{"id": 0, "data": "REST API"}],
+            tags="python,backend",
+            args={"constrain_tags": True},
+        )
+
+        schema = formats[0]["json_schema"]["schema"]
+        assert schema["properties"]["labels"]["items"]["enum"] == ["python", "backend"]
+        assert results == [{"id": 0, "result": "backend,python"}]
+
+    async def test_batch_reply_is_read_from_answers(self, templates):
+        """Test a constrained batch reply maps its answers back to the items."""
+        client = FakeLLMClient(lambda messages: '{"answers": [["python"], []]}')
+        items = [{"id": 0, "data": "py"}, {"id": 1, "data": "ab"}]
+
+        results = await MultiLabelOperation().execute(
+            client, templates.get_template("tag"), items, tags="python,backend", args={"constrain_tags": True}
+        )
+
+        assert len(client.calls) == 1
+        assert results == [{"id": 0, "result": "python"}, {"id": 1, "result": ""}]
+
+
+class TestMultiLabelResponseCache:
+    """Test that deterministic tagging results are reused across calls."""
+
+    async def test_repeated_call_is_served_from_cache(self, templates):
+        """Test a second identical call makes no LLM calls."""
+        client = FakeLLMClient(lambda messages: "python")
+        template = templates.get_template("tag")
+
+        for _ in range(2):
+            results = await MultiLabelOperation().execute(
+                client, template, [{"id": 0, "data": "REST API"}], tags="python,backend"
+            )
+
+        assert len(client.calls) == 1
+        assert results == [{"id": 0, "result": "python"}]
+
+    async def test_different_tags_are_not_a_hit(self, templates):
+        """Test a different tag list reaches the LLM again."""
+        client = FakeLLMClient(lambda messages: "python")
+        template = templates.get_template("tag")
+
+        await MultiLabelOperation().execute(client, template, [{"id": 0, "data": "REST API"}], tags="python,backend")
+        await MultiLabelOperation().execute(client, template, [{"id": 0, "data": "REST API"}], tags="python,frontend")
+
+        assert len(client.calls) == 2
+
+    async def test_errors_are_not_cached(self, templates):
+        """Test a failed item is retried on the next call."""
+        answers = iter([_upstream_failure(), "python"])
+
+        def answer(messages):
+            value = next(answers)
+            if isinstance(value, Exception):
+                raise value
+            return value
+
+        client = FakeLLMClient(answer)
+        template = templates.get_template("tag")
+
+        first = await MultiLabelOperation().execute(client, template, [{"id": 0, "data": "REST API"}], tags="python")
+        second = await MultiLabelOperation().execute(client, template, [{"id": 0, "data": "REST API"}], tags="python")
+
+        assert "error" in first[0]
+        assert second == [{"id": 0, "result": "python"}]
+
+
+class TestMultiLabelErrors:
+    """Test that a failing item is reported without failing the others."""
+
+    @staticmethod
+    def _fail_on(word):
+        def answer(messages):
+            if word in messages[-1]["content"]:
+                raise _upstream_failure()
+            return "python"
+
+        return answer
+
+    async def test_failed_item_gets_error(self, templates):
+        """Test a failing item carries an error while the rest are tagged."""
+        client = FakeLLMClient(self._fail_on("bad"))
+        items = [{"id": 0, "data": "good"}, {"id": 1, "data": "bad"}, {"id": 2, "data": "good too"}]
+
+        results = await MultiLabelOperation().execute(
+            client, templates.get_template("tag"), items, tags="python,backend"
+        )
+
+        assert results == [
+            {"id": 0, "result": "python"},
+            {"id": 1, "result": None, "error": "upstream failure"},
+            {"id": 2, "result": "python"},
+        ]
+
+    async def test_auth_error_fails_the_call(self, templates):
+        """Test an error that would repeat for every item is raised without per-item retries."""
+        def answer(messages):
+            request = httpx.Request("POST", "https://api.test")
+            raise AuthenticationError("bad key", response=httpx.Response(401, request=request), body=None)
+
+        client = FakeLLMClient(answer)
+        items = [{"id": i, "data": f"item {i}"} for i in range(3)]
+
+        with pytest.raises(AuthenticationError):
+            await MultiLabelOperation().execute(client, templates.get_template("tag"), items, tags="python")
+
+        assert len(client.calls) == 1
+
+    async def test_programming_errors_propagate(self, templates):
+        """Test unexpected exceptions are not turned into item errors."""
+        def answer(messages):
+            raise KeyError("bug")
+
+        client = FakeLLMClient(answer)
+
+        with pytest.raises(KeyError):
+            await MultiLabelOperation().execute(
+                client, templates.get_template("tag"), [{"id": 0, "data": "x"}], tags="python"
+            )
+
+    async def test_client_config_error_fails_the_call(self, templates):
+        """Test a client configuration error is raised instead of becoming item errors."""
+        def answer(messages):
+            raise ValueError("OPENAI_API_KEY not set but model requires OpenAI")
+
+        client = FakeLLMClient(answer)
+        items = [{"id": i, "data": f"item {i}"} for i in range(3)]
+
+        with pytest.raises(ValueError, match="OPENAI_API_KEY"):
+            await MultiLabelOperation().execute(client, templates.get_template("tag"), items, tags="python")
+
+    async def test_single_input_error_is_raised(self, templates, monkeypatch):
+        """Test a failure on a single string input is raised rather than returned."""
+        client = FakeLLMClient(self._fail_on("bad"))
+        monkeypatch.setattr("src.tools.llm_tool_executor.get_llm_client", lambda: client)
+        executor = LLMToolExecutor(templates.get_template("tag"))
+
+        with pytest.raises(ValueError, match="upstream failure"):
+            await executor.execute(input="bad", tags="python,backend")
+
+
+class TestExecutorValidation:
+    """Test that bad or empty calls are settled before any LLM client is created."""
+
+    @pytest.fixture
+    def no_llm_client(self, monkeypatch):
+        """Make creating an LLM client fail."""
+        def fail():
+            raise AssertionError("LLM client should not be created")
+
+        monkeypatch.setattr("src.tools.llm_tool_executor.get_llm_client", fail)
+
+    async def test_single_category_fails_before_client(self, templates, no_llm_client):
+        """Test too few categories raises without touching the LLM client."""
+        executor = LLMToolExecutor(templates.get_template("classify"))
+
+        with pytest.raises(ValueError, match="at least 2"):
+            await executor.execute(input="Some content", categories="tech")
+
+    async def test_missing_tags_fail_before_client(self, templates, no_llm_client):
+        """Test empty tags raise without touching the LLM client."""
+        executor = LLMToolExecutor(templates.get_template("tag"))
+
+        with pytest.raises(ValueError, match="at least 1"):
+            await executor.execute(input="Some content", tags=" , ")
+
+    async def test_empty_input_list_skips_client(self, templates, no_llm_client):
+        """Test an empty input list returns [] without touching the LLM client."""
+        executor = LLMToolExecutor(templates.get_template("classify"))
+
+        assert await executor.execute(input=[], categories="tech,sports") == []
+
+
+class TestTokenBoundedBatches:
+    """Test that batches are also bounded by an estimated token budget."""
+
+    def test_split_respects_token_budget(self):
+        """Test long items are packed into smaller batches."""
+        items = [{"id": i, "data": "x" * 400} for i in range(5)]  # ~101 tokens each
+
+        batches = SingleChoiceOperation().split_batches(items, batch_size=20, max_batch_tokens=250)
+
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+
+    def test_oversized_item_gets_its_own_batch(self):
+        """Test an item over the budget on its own is not merged with others."""
+        items = [{"id": 0, "data": "short"}, {"id": 1, "data": "x" * 4000}, {"id": 2, "data": "short"}]
+
+        batches = SingleChoiceOperation().split_batches(items, batch_size=20, max_batch_tokens=100)
+
+        assert [[item["id"] for item in batch] for batch in batches] == [[0], [1], [2]]
+
+    async def test_long_text_is_extracted_alone(self, templates):
+        """Test a very long text is sent in its own call while short ones share a batch."""
+        client = FakeLLMClient(_numbered_answer(EXTRACT_PROMPT, lambda text: "v"))
+        items = [{"id": 0, "data": "a"}, {"id": 1, "data": "b"}, {"id": 2, "data": "word " * 10000}]
+
+        results = await ExtractionOperation().execute(
+            client, templates.get_template("extract"), items, item_to_extract="value"
+        )
+
+        assert len(client.calls) == 2
+        assert [r["result"] for r in results] == ["v", "v", "v"]
+
+
+class TestTruncatedBatchReplies:
+    """Test that complete answers from a cut-off batch reply are kept."""
+
+    async def test_only_unanswered_items_are_retried(self, templates):
+        """Test a truncated array keeps its complete answers and retries the rest."""
+        def answer(messages):
+            if "[1]" in messages[-1]["content"]:
+                return '```json\n["tech", "sports", "te'
+            return "politics"
+
+        client = FakeLLMClient(answer)
+        items = [{"id": i, "data": f"item {i}"} for i in range(3)]
+
+        results = await SingleChoiceOperation().execute(
+            client, templates.get_template("classify"), items, categories="tech,sports,politics"
+        )
+
+        assert len(client.calls) == 2
+        assert [r["result"] for r in results] == ["tech", "sports", "politics"]
+
+    def test_prefix_decoding_skips_partial_element(self):
+        """Test only fully closed elements are decoded."""
+        operation = SingleChoiceOperation()
+
+        assert operation.parse_batch_response('[{"a": 1}, {"b": [2, 3]}, {"c":', 3) == [{"a": 1}, {"b": [2, 3]}]
+        assert operation.parse_batch_response('[{"a": 1', 2) is None
+
+    def test_numbered_text_reply_is_not_an_array(self):
+        """Test a numbered plain-text reply is not salvaged as a JSON array."""
+        operation = ExtractionOperation()
+
+        assert operation.parse_batch_response("[1] John Smith\n[2] Jane Doe", 2) is None
+
+    async def test_numbered_text_batch_reply_is_retried_per_item(self, templates):
+        """Test extraction retries each item when the batch reply is numbered text."""
+        def answer(messages):
+            if "[1]" in messages[-1]["content"]:
+                return "[1] John Smith\n[2] Jane Doe"
+            return "John Smith" if "John" in messages[-1]["content"] else "Jane Doe"
+
+        client = FakeLLMClient(answer)
+        items = [{"id": 0, "data": "Post by John"}, {"id": 1, "data": "Post by Jane"}]
+
+        results = await ExtractionOperation().execute(
+            client, templates.get_template("extract"), items, item_to_extract="author"
+        )
+
+        assert len(client.calls) == 3
+        assert [r["result"] for r in results] == ["John Smith", "Jane Doe"]
+
+
+class TestExtractionConcurrency:
+    """Test that extraction calls run concurrently."""
+
+    async def test_concurrency_is_bounded(self, templates):
+        """Test args.concurrency caps the number of in-flight extraction calls."""
+        client = FakeLLMClient(lambda messages: "value")
+        items = [{"id": i, "data": f"item {i}"} for i in range(10)]
+
+        results = await ExtractionOperation().execute(
+            client,
+            templates.get_template("extract"),
+            items,
+            item_to_extract="value",
+            args={"concurrency": 4, "batch_size": 1},
+        )
+
+        assert len(client.calls) == 10
+        assert client.peak_in_flight == 4
+        assert [r["id"] for r in results] == list(range(10))
+
+
+class TestExtractionBatching:
+    """Test that several items are extracted in one LLM call."""
+
+    async def test_batch_uses_one_call(self, templates):
+        """Test a list of items is extracted with a single batched call, in order."""
+        client = FakeLLMClient(_numbered_answer(EXTRACT_PROMPT, lambda text: text.split(" by ", 1)[1]))
+        items = [{"id": i, "data": f"Post by {name}"} for i, name in enumerate(["Ann", "Bob", "Cy"])]
+
+        results = await ExtractionOperation().execute(
+            client, templates.get_template("extract"), items, input=[], item_to_extract="author"
+        )
+
+        assert len(client.calls) == 1
+        assert results == [{"id": 0, "result": "Ann"}, {"id": 1, "result": "Bob"}, {"id": 2, "result": "Cy"}]
+
+    async def test_duplicate_texts_are_extracted_once(self, templates):
+        """Test duplicate texts are sent once and their result is copied to every id."""
+        client = FakeLLMClient(_numbered_answer(EXTRACT_PROMPT, lambda text: text.split(" by ", 1)[1]))
+        items = [
+            {"id": "a", "data": "Post by Ann"},
+            {"id": "b", "data": "Post by Bob"},
+            {"id": "c", "data": "Post by Ann"},
+        ]
+
+        results = await ExtractionOperation().execute(
+            client, templates.get_template("extract"), items, item_to_extract="author", args={"batch_size": 1}
+        )
+
+        assert len(client.calls) == 2
+        assert results == [{"id": "a", "result": "Ann"}, {"id": "b", "result": "Bob"}, {"id": "c", "result": "Ann"}]
+
+    async def test_texts_differing_in_whitespace_are_extracted_once(self, templates):
+        """Test texts are cleaned before dispatch, so whitespace variants share one call."""
+        client = FakeLLMClient(_numbered_answer(EXTRACT_PROMPT, lambda text: text.split(" by ", 1)[1]))
+        items = [{"id": "a", "data": "Post by Ann"}, {"id": "b", "data": " Post  by\tAnn "}]
+
+        results = await ExtractionOperation().execute(
+            client, templates.get_template("extract"), items, item_to_extract="author", args={"batch_size": 1}
+        )
+
+        assert len(client.calls) == 1
+        assert results == [{"id": "a", "result": "Ann"}, {"id": "b", "result": "Ann"}]
+
+    async def test_text_and_json_values_are_not_merged(self, templates):
+        """Test the text "1" and the number 1 are extracted separately."""
+        client = FakeLLMClient(_numbered_answer(EXTRACT_PROMPT, lambda text: text))
+        items = [{"id": "a", "data": "1"}, {"id": "b", "data": 1}, {"id": "c", "data": "null"}, {"id": "d", "data": None}]
+
+        await ExtractionOperation().execute(
+            client, templates.get_template("extract"), items, item_to_extract="value", args={"batch_size": 1}
+        )
+
+        assert len(client.calls) == 4
+
+    async def test_integers_beyond_64_bits_are_deduplicated(self, templates):
+        """Test non-text data too large for orjson still gets a dedup key."""
+        client = FakeLLMClient(lambda messages: "value")
+        items = [{"id": "a", "data": 2**70}, {"id": "b", "data": {"n": 2**70}}, {"id": "c", "data": 2**70}]
+
+        results = await ExtractionOperation().execute(
+            client, templates.get_template("extract"), items, item_to_extract="value", args={"batch_size": 1}
+        )
+
+        assert len(client.calls) == 2
+        assert [r["result"] for r in results] == ["value", "value", "value"]
+
+    async def test_null_becomes_text(self, templates):
+        """Test a batched null answer matches the plain-text "null" of a single call."""
+        client = FakeLLMClient(lambda messages: '[null, "42", "  x "]')
+        items = [{"id": i, "data": f"item {i}"} for i in range(3)]
+
+        results = await ExtractionOperation().execute(
+            client, templates.get_template("extract"), items, item_to_extract="value"
+        )
+
+        assert len(client.calls) == 1
+        assert [r["result"] for r in results] == ["null", "42", "x"]
+
+    async def test_bare_numbers_fall_back_per_item(self, templates):
+        """Test a batch reply of bare numbers is not taken as extracted values."""
+        def answer(messages):
+            return "[1, 2]" if "[1]" in messages[-1]["content"] else "value"
+
+        client = FakeLLMClient(answer)
+        items = [{"id": i, "data": f"item {i}"} for i in range(2)]
+
+        results = await ExtractionOperation().execute(
+            client, templates.get_template("extract"), items, item_to_extract="value"
+        )
+
+        assert len(client.calls) == 3
+        assert [r["result"] for r in results] == ["value", "value"]
+
+    async def test_batch_uses_batch_prompts(self, templates):
+        """Test batched calls use the batch templates instead of the plain-text ones."""
+        client = FakeLLMClient(_numbered_answer(EXTRACT_PROMPT, lambda text: "v"))
+        items = [{"id": 0, "data": "a"}, {"id": 1, "data": "b"}]
+
+        await ExtractionOperation().execute(
+            client, templates.get_template("extract"), items, item_to_extract="author", prompt="Be strict."
+        )
+
+        system, user = client.calls[0]
+        assert "JSON array" in system["content"]
+        assert "Do NOT return JSON" not in system["content"]
+        assert system["content"].endswith("Be strict.")
+        assert user["content"].endswith("Extracted values (JSON array):")
+
+    async def test_unusable_batch_falls_back_per_item(self, templates):
+        """Test a batch reply with non-text answers is retried item by item."""
+        def answer(messages):
+            return '[{"a": 1}, {"b": 2}]' if "[1]" in messages[-1]["content"] else "value"
+
+        client = FakeLLMClient(answer)
+        items = [{"id": i, "data": f"item {i}"} for i in range(2)]
+
+        results = await ExtractionOperation().execute(
+            client, templates.get_template("extract"), items, item_to_extract="value"
+        )
+
+        assert len(client.calls) == 3
+        assert results == [{"id": 0, "result": "value"}, {"id": 1, "result": "value"}]
+
+    async def test_metric_batch_keeps_entity_and_date(self, templates):
+        """Test batched metric extraction keeps the shared entity and date in the prompt."""
+        client = FakeLLMClient(lambda messages: '["$1", "$2"]')
+        items = [{"id": i, "data": f"report {i}"} for i in range(2)]
+
+        await ExtractionOperation().execute(
+            client,
+            templates.get_template("extract_metric_by_entity"),
+            items,
+            input=[],
+            entity_to_extract="AAPL",
+            item_to_extract="EPS",
+            date="2024",
+        )
+
+        prompt = client.calls[0][-1]["content"]
+        assert len(client.calls) == 1
+        assert "Entity: AAPL" in prompt and "Date: 2024" in prompt
+        assert "[1]\nreport 0\n\n[2]\nreport 1" in prompt
+
+
+class TestExtractionResponseCache:
+    """Test that deterministic extraction results are reused across calls."""
+
+    async def test_repeated_extraction_is_served_from_cache(self, templates):
+        """Test extracting the same field from the same text twice makes one LLM call."""
+        client = FakeLLMClient(lambda messages: "Wade")
+        template = templates.get_template("extract")
+        items = [{"id": 0, "data": "Article by Wade on 2025-10-12 about AI"}]
+
+        first = await ExtractionOperation().execute(client, template, items, item_to_extract="author")
+        second = await ExtractionOperation().execute(client, template, items, item_to_extract="author")
+
+        assert len(client.calls) == 1
+        assert first == second == [{"id": 0, "result": "Wade"}]
+
+    async def test_different_field_is_not_a_hit(self, templates):
+        """Test the cache key includes the field being extracted."""
+        client = FakeLLMClient(lambda messages: "x")
+        template = templates.get_template("extract")
+        items = [{"id": 0, "data": "Article by Wade on 2025-10-12 about AI"}]
+
+        await ExtractionOperation().execute(client, template, items, item_to_extract="author")
+        await ExtractionOperation().execute(client, template, items, item_to_extract="date")
+
+        assert len(client.calls) == 2
+
+
+PERSON_SCHEMA = {
+    "type": "object",
+    "properties": {"name": {"type": "string"}, "age": {"type": "integer"}},
+    "required": ["name", "age"],
+}
+
+
+@pytest.fixture
+def structured_template(templates):
+    """The extract template with a structured-output system prompt."""
+    template = templates.get_template("extract")
+    prompts = template.prompt_templates.model_copy(update={"structured_system": "Return JSON."})
+    return template.model_copy(update={"prompt_templates": prompts})
+
+
+class TestStructuredExtraction:
+    """Test extraction with a response_format schema."""
+
+    async def test_valid_output_needs_one_call(self, structured_template):
+        """Test output matching the schema is returned as a JSON string."""
+        client = FakeLLMClient(lambda messages: '{"name": "Ann", "age": 30}')
+
+        results = await ExtractionOperation().execute(
+            client, structured_template, [{"id": 0, "data": "Ann, 30"}], response_format=PERSON_SCHEMA
+        )
+
+        assert len(client.calls) == 1
+        assert json.loads(results[0]["result"]) == {"name": "Ann", "age": 30}
+
+    async def test_schema_is_in_shared_system_prompt(self, structured_template):
+        """Test the schema is sent in the system prompt, identical for every item."""
+        client = FakeLLMClient(lambda messages: '{"name": "Ann", "age": 30}')
+        items = [{"id": 0, "data": "Ann, 30"}, {"id": 1, "data": "Bob, 40"}]
+
+        await ExtractionOperation().execute(
+            client, structured_template, items, response_format=PERSON_SCHEMA, args={"batch_size": 1}
+        )
+
+        systems = {messages[0]["content"] for messages in client.calls}
+        assert len(systems) == 1
+        assert '"required"' in systems.pop()
+        assert all('"required"' not in messages[-1]["content"] for messages in client.calls)
+
+    async def test_large_integers_are_kept_exact(self, structured_template):
+        """Test integers beyond 64 bits in the schema and the output survive unchanged."""
+        schema = {"type": "object", "properties": {"id": {"type": "integer", "maximum": 2**70}}}
+        def answer(messages):
+            if "[1]" in messages[-1]["content"]:
+                return f'[{{"id": {2**65}}}, {{"id": {2**65}}}]'
+            return f'{{"id": {2**65}}}'
+
+        client = FakeLLMClient(answer)
+        items = [{"id": 0, "data": "a"}, {"id": 1, "data": "b"}]
+
+        results = await ExtractionOperation().execute(client, structured_template, items, response_format=schema)
+        single = await ExtractionOperation().execute(
+            client, structured_template, items[:1], response_format=schema, args={"temperature": 0.5}
+        )
+
+        assert [r["result"] for r in results + single] == ['{"id": 36893488147419103232}'] * 3
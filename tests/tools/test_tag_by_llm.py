@@ -9,8 +9,11 @@ Simplified single input/output format:
 
 import pytest
 
+# One xdist worker per tool under --dist loadgroup, so each reuses its warm client and caches
+pytestmark = [pytest.mark.llm, pytest.mark.xdist_group("tag_by_llm")]
 
-@pytest.fixture
+
+@pytest.fixture(scope="session")
 def tag_by_llm():
     """
     Fixture that provides the tag_by_llm function.
@@ -32,8 +35,8 @@ class TestTagByLLMBasic:
 
         assert isinstance(result, str)
 
-        # Parse comma-separated result
-        result_tags = [t.strip() for t in result.split(",") if t.strip()]
+        # Parse comma-separated result into a set for membership checks
+        result_tags = {t.strip() for t in result.split(",") if t.strip()}
 
         # Should return backend and database
         assert "backend" in result_tags
@@ -52,7 +55,7 @@ class TestTagByLLMBasic:
         )
 
         assert isinstance(result, str)
-        result_tags = [t.strip() for t in result.split(",") if t.strip()]
+        result_tags = {t.strip() for t in result.split(",") if t.strip()}
 
         assert "python" in result_tags
         assert "backend" in result_tags
@@ -81,7 +84,7 @@ class TestTagByLLMWithPrompt:
             prompt="Tag based on the main technologies and domains involved"
         )
 
-        result_tags = [t.strip() for t in result.split(",") if t.strip()]
+        result_tags = {t.strip() for t in result.split(",") if t.strip()}
 
         # Should include main technologies
         assert "python" in result_tags